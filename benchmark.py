@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+benchmark.py: Microbenchmarks of the simulation kernels. Every benchmark checks
+    the fast path against the reference implementation before timing it:
+        python benchmark.py otter -v 1000
+        python benchmark.py crossflow
+        python benchmark.py planar
+        python benchmark.py integrators -v 100
+        python benchmark.py arcs
+"""
+import argparse
+import timeit
+import numpy as np
+import vehicles as vs
+import integrators as integ
+from lib.gnc import crossFlowDrag, crossFlowDragBatch, crossFlowDragStrips
+
+
+def get_otter_states(vehicles, seed=0):
+    rng = np.random.default_rng(seed)
+    eta = rng.normal(size=(vehicles, 6)) * [5, 5, 0.1, 0.2, 0.2, 3]
+    nu = rng.normal(size=(vehicles, 6))
+    u_actual = rng.normal(size=(vehicles, 2)) * 80
+    u_control = rng.normal(size=(vehicles, 2)) * 80
+    return eta, nu, u_actual, u_control
+
+
+def report(name, seconds, steps):
+    print(f'{name:<40} {seconds / steps * 1e6:10.2f} us per vehicle step')
+
+
+def benchmark_otter(vehicles, repeat, sample_time=0.02):
+    """
+    Compare Otter.dynamics, called once per vehicle, with the constant-folded
+    Otter.dynamics_batch, called for one vehicle and for the whole fleet.
+    """
+    otter = vs.create_instance('otter', V_current=0.5, beta_current=30)
+    eta, nu, u_actual, u_control = get_otter_states(vehicles)
+
+    reference = [otter.dynamics(eta[k].copy(), nu[k].copy(), u_actual[k].copy(), u_control[k].copy(), sample_time)
+                 for k in range(vehicles)]
+    nu_batch, n_batch = otter.dynamics_batch(eta, nu, u_actual, u_control, sample_time)
+    print(f'max deviation: nu {np.abs(nu_batch - np.array([r[0] for r in reference])).max():.3g}, '
+          f'u_actual {np.abs(n_batch - np.array([r[1] for r in reference])).max():.3g}')
+
+    seconds = min(timeit.repeat(lambda: otter.dynamics(eta[0], nu[0], u_actual[0], u_control[0], sample_time),
+                                number=repeat, repeat=3))
+    report('dynamics, 1 vehicle', seconds, repeat)
+    seconds = min(timeit.repeat(lambda: otter.dynamics_batch(eta[:1], nu[:1], u_actual[:1], u_control[:1],
+                                                              sample_time), number=repeat, repeat=3))
+    report('dynamics_batch, 1 vehicle', seconds, repeat)
+    number = max(repeat // vehicles, 1)
+    seconds = min(timeit.repeat(lambda: otter.dynamics_batch(eta, nu, u_actual, u_control, sample_time),
+                                number=number, repeat=3))
+    report(f'dynamics_batch, {vehicles} vehicles', seconds, number * vehicles)
+
+
+def get_crossflow_velocities(vehicles, seed=0):
+    """
+    Random relative velocities over several scales, plus the edge cases of the closed form:
+    no yaw rate, no sway, no motion, and sign changes exactly on a strip.
+    """
+    rng = np.random.default_rng(seed)
+    nu_r = rng.normal(size=(vehicles, 6)) * rng.choice([1e-3, 1, 10], size=(vehicles, 1))
+    edge = max(vehicles // 10, 1)
+    nu_r[:edge, 5] = 0
+    nu_r[edge:2 * edge, 1] = 0
+    nu_r[2 * edge:3 * edge] = 0
+    nu_r[3 * edge:4 * edge, 5] = 1
+    nu_r[3 * edge:4 * edge, 1] = 1 - 0.1 * rng.integers(0, 21, len(nu_r[3 * edge:4 * edge]))
+    return nu_r
+
+
+def benchmark_crossflow(vehicles, repeat, L=2.0, B=0.25, T=0.2, tolerance=1e-12):
+    """
+    Check the closed-form crossFlowDrag and crossFlowDragBatch against the strip by strip
+    sum, relative to the largest force or moment of every velocity, then time them.
+    """
+    nu_r = get_crossflow_velocities(vehicles)
+    reference = np.array([crossFlowDragStrips(L, B, T, row) for row in nu_r])
+    scale = np.abs(reference).max(axis=1, keepdims=True) + np.finfo(float).tiny
+    deviation = np.abs(np.array([crossFlowDrag(L, B, T, row) for row in nu_r]) - reference) / scale
+    batch_deviation = np.abs(crossFlowDragBatch(L, B, T, nu_r) - reference) / scale
+    print(f'max relative deviation: crossFlowDrag {deviation.max():.3g}, crossFlowDragBatch {batch_deviation.max():.3g}')
+    assert deviation.max() < tolerance and batch_deviation.max() < tolerance, 'closed form differs from the strip sum'
+
+    seconds = min(timeit.repeat(lambda: crossFlowDragStrips(L, B, T, nu_r[-1]), number=repeat, repeat=3))
+    report('crossFlowDragStrips, 1 vehicle', seconds, repeat)
+    seconds = min(timeit.repeat(lambda: crossFlowDrag(L, B, T, nu_r[-1]), number=repeat, repeat=3))
+    report('crossFlowDrag, 1 vehicle', seconds, repeat)
+    number = max(repeat // vehicles, 1)
+    seconds = min(timeit.repeat(lambda: crossFlowDragBatch(L, B, T, nu_r), number=number, repeat=3))
+    report(f'crossFlowDragBatch, {vehicles} vehicles', seconds, number * vehicles)
+
+
+def benchmark_planar(vehicles, repeat, sample_time=0.02):
+    """
+    Time one Otter.step_batch (dynamics and repositioning) of the 6-DOF and of the planar
+    3-DOF model. The planar model is a reduction, so the deviation between both is only reported.
+    """
+    eta, nu, u_actual, u_control = get_otter_states(vehicles)
+    eta[:, 2:5] = 0
+    nu[:, 2:5] = 0
+    results = {}
+    for planar in (False, True):
+        otter = vs.create_instance('otter', V_current=0.5, beta_current=30, planar=planar)
+        results[planar] = otter.step_batch(eta, nu, u_actual, u_control, sample_time)
+        name = 'planar' if planar else '6-DOF'
+        seconds = min(timeit.repeat(lambda: otter.step_batch(eta[:1], nu[:1], u_actual[:1], u_control[:1],
+                                                              sample_time), number=repeat, repeat=3))
+        report(f'step_batch {name}, 1 vehicle', seconds, repeat)
+        number = max(repeat // vehicles, 1)
+        seconds = min(timeit.repeat(lambda: otter.step_batch(eta, nu, u_actual, u_control, sample_time),
+                                    number=number, repeat=3))
+        report(f'step_batch {name}, {vehicles} vehicles', seconds, number * vehicles)
+    planar = [0, 1, 5]
+    print(f'max deviation after one step: eta {np.abs(results[True][0] - results[False][0])[:, planar].max():.3g}, '
+          f'nu {np.abs(results[True][1] - results[False][1])[:, planar].max():.3g}')
+
+
+def simulate_otters(integrator, u_control, sample_time):
+    """
+    Propagate a fleet of Otters from rest through the control sequence u_control of shape
+    (steps, V, 2), held over each controller sample.
+
+    Returns:
+    tuple: (eta at the end, seconds taken).
+    """
+    otter = vs.create_instance('otter', V_current=0.5, beta_current=30)
+    otter.set_integrator(integrator)
+    vehicles = u_control.shape[1]
+    eta, nu, u_actual = np.zeros((vehicles, 6)), np.zeros((vehicles, 6)), np.zeros((vehicles, 2))
+    start = timeit.default_timer()
+    for u in u_control:
+        eta, nu, u_actual = otter.step_batch(eta, nu, u_actual, u, sample_time)
+    return eta, timeit.default_timer() - start
+
+
+def benchmark_integrators(vehicles, repeat, sample_time=0.1, sim_time=20):
+    """
+    Accuracy against cost of the integrators: a fleet of Otters follows random propeller
+    commands held over a controller sample of sample_time. The error is the largest
+    distance to a tightly toleranced RK45 solution at the end of the run.
+    """
+    rng = np.random.default_rng(0)
+    steps = round(sim_time / sample_time)
+    # One command per vehicle and second, held over the samples of that second
+    commands = rng.uniform(-40, 100, size=(sim_time, vehicles, 2))
+    u_control = commands[(np.arange(steps) * sample_time).astype(int)]
+    reference, _ = simulate_otters(integ.create_instance('rk45', tolerance=1e-11), u_control, sample_time)
+    settings = [('euler', dict(time_step=0.02)), ('euler', dict(time_step=0.01)), ('euler', dict(time_step=0.005)),
+                ('rk4', dict(time_step=0.1)), ('rk4', dict(time_step=0.05)), ('rk4', dict(time_step=0.02)),
+                ('rk45', dict(tolerance=1e-4)), ('rk45', dict(tolerance=1e-6)), ('rk45', dict(tolerance=1e-8))]
+    print(f'{vehicles} vehicles, {sim_time} s, controller sample {sample_time} s')
+    print(f'{"integrator":<48} {"error (m)":>10} {"calls/s":>10} {"us per vehicle-second":>22}')
+    for name, arguments in settings:
+        integrator = integ.create_instance(name, **arguments)
+        eta, seconds = simulate_otters(integrator, u_control, sample_time)
+        error = np.hypot(*(eta[:, :2] - reference[:, :2]).T).max()
+        print(f'{str(integrator):<48} {error:10.3g} {integrator.evaluations / sim_time:10.0f} '
+              f'{seconds / (vehicles * sim_time) * 1e6:22.2f}')
+
+
+def benchmark_arcs(vehicles, repeat, sample_time=0.02, samples=500):
+    """
+    Dubins vehicles holding random wheel speeds over samples: the error of stepping with each
+    integrator against the closed-form arcs, and the cost of stepping against one call of
+    get_hold_trajectory_batch.
+    """
+    rng = np.random.default_rng(0)
+    u_control = rng.uniform(-5, 10, size=(vehicles, 2))
+    u_control[:vehicles // 10, 1] = u_control[:vehicles // 10, 0]  # straight lines
+    eta = np.zeros((vehicles, 6))
+    eta[:, 3] = rng.uniform(-np.pi, np.pi, vehicles)
+    zeros = np.zeros((vehicles, 6)), np.zeros((vehicles, 2))
+    dubins = vs.create_instance('dubins', exact_arcs=True)
+    exact, _, _ = dubins.get_hold_trajectory_batch(eta, *zeros, u_control, sample_time, samples)
+    seconds = min(timeit.repeat(lambda: dubins.get_hold_trajectory_batch(eta, *zeros, u_control, sample_time, samples),
+                                number=1, repeat=3))
+    report(f'closed form, {samples} samples at once', seconds, samples * vehicles)
+
+    def step(vehicle):
+        state = (eta, *zeros)
+        for _ in range(samples):
+            state = vehicle.step_batch(*state, u_control, sample_time)
+        return state[0]
+
+    for name in ('euler', 'rk4', 'exact'):
+        dubins = vs.create_instance('dubins', exact_arcs=name == 'exact')
+        if name != 'exact':
+            dubins.set_integrator(integ.create_instance(name))
+        error = np.abs(step(dubins) - exact[-1])[:, :2].max()
+        seconds = min(timeit.repeat(lambda: step(dubins), number=1, repeat=3))
+        report(f'{name} steps, error {error:.3g} m', seconds, samples * vehicles)
+
+
+benchmarks = {
+    'otter': benchmark_otter,
+    'crossflow': benchmark_crossflow,
+    'planar': benchmark_planar,
+    'integrators': benchmark_integrators,
+    'arcs': benchmark_arcs,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='benchmark', description='Microbenchmarks of the simulation kernels')
+    parser.add_argument('name', choices=sorted(benchmarks), help='benchmark to run')
+    parser.add_argument('-v', '--vehicles', type=int, default=1000, help='number of vehicles in a batch')
+    parser.add_argument('-r', '--repeat', type=int, default=2000, help='calls per timing')
+    args = parser.parse_args()
+    benchmarks[args.name](args.vehicles, args.repeat)
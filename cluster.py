@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cluster.py: Parameter sweep over several hosts. A coordinator holds the runs of a sweep grid
+    (see sweep.py) and serves them over TCP through a multiprocessing manager. Workers pull
+    one run at a time, simulate it and send back its summary row:
+        python cluster.py serve -c config.json -g grid.json -a 0.0.0.0:50000
+        python cluster.py work -a coordinator-host:50000 -k <authkey printed by serve> -w 8
+    Or a coordinator with local workers, on one machine:
+        python cluster.py local -c config.json -g grid.json -w 4
+    Failed runs are retried up to --attempts times, also when their worker stops sending
+    heartbeats. Workers need the same source tree and peak files as the coordinator; they
+    store their run folders and space caches locally, and the worker processes of a host
+    share its static spaces (share_spaces). The manager connection unpickles
+    what it receives, so the authkey must be kept secret: serve generates a random one
+    unless -k is given, work requires it, and local uses a random one of its own.
+"""
+import os
+import time
+import secrets
+import json
+import socket
+import argparse
+import threading
+import collections
+import multiprocessing
+from multiprocessing.managers import BaseManager
+from sweep import expand_grid, get_worker_count, initialize_worker, publish_spaces, run_configuration, \
+    get_columns, print_summary, store_summary
+from tools import DataStorage
+
+HEARTBEAT_INTERVAL = 5  # seconds between two heartbeats of a busy worker
+
+
+class SweepManager(BaseManager):
+    pass
+
+
+class JobBoard:
+    """
+    Runs of a sweep shared with the workers: pending runs, runs leased to a worker and the
+    summary rows of the finished ones. Its methods are called from the manager's threads.
+    """
+    def __init__(self, config, runs, attempts=3, worker_timeout=30):
+        """
+        Parameters:
+        config (dict): Base configuration.
+        runs (list): Overrides of every run, see expand_grid().
+        attempts (int): Number of times a run is tried before it is reported as failed.
+        worker_timeout (float): Seconds without a call after which a worker is considered lost.
+        """
+        self.config = config
+        self.runs = runs
+        self.attempts = attempts
+        self.worker_timeout = worker_timeout
+        self.pending = collections.deque(range(len(runs)))
+        self.failures = [0] * len(runs)
+        self.leases = {}  # run: worker
+        self.heartbeats = {}  # worker: time of its last call
+        self.rows = {}  # run: summary row
+        self.condition = threading.Condition()
+
+    def is_finished(self) -> bool:
+        return len(self.rows) == len(self.runs)
+
+    def get_config(self) -> dict:
+        return self.config
+
+    def get_runs(self) -> list:
+        return self.runs
+
+    def get_job(self, worker):
+        """
+        Lease the next pending run to worker, waiting while all remaining runs are leased.
+
+        Returns:
+        tuple: (run, overrides), None when the sweep is finished.
+        """
+        with self.condition:
+            while not self.pending and not self.is_finished():
+                self.heartbeats[worker] = time.monotonic()
+                self.condition.wait(1)
+            self.heartbeats[worker] = time.monotonic()
+            if self.is_finished():
+                return None
+            run = self.pending.popleft()
+            self.leases[run] = worker
+            return run, self.runs[run]
+
+    def heartbeat(self, worker):
+        with self.condition:
+            self.heartbeats[worker] = time.monotonic()
+
+    def put_result(self, worker, run, row):
+        with self.condition:
+            self.heartbeats[worker] = time.monotonic()
+            if run in self.rows:
+                return  # a retry finished first
+            # A run retried after its worker was lost may still be pending
+            if run in self.pending:
+                self.pending.remove(run)
+            self.leases.pop(run, None)
+            self.rows[run] = row
+            print(f'run {run} finished on {worker} ({len(self.rows)}/{len(self.runs)})')
+            self.condition.notify_all()
+
+    def put_failure(self, worker, run, error):
+        with self.condition:
+            self.heartbeats[worker] = time.monotonic()
+            self.fail(run, error)
+
+    def fail(self, run, error):
+        if run in self.rows or self.leases.pop(run, None) is None:
+            return
+        self.failures[run] += 1
+        if self.failures[run] < self.attempts:
+            print(f'run {run} failed, attempt {self.failures[run]} of {self.attempts}: {error}')
+            self.pending.append(run)
+        else:
+            print(f'run {run} failed ({len(self.rows) + 1}/{len(self.runs)}): {error}')
+            self.rows[run] = {'run': run, **self.runs[run], 'error': error}
+        self.condition.notify_all()
+
+    def release_lost_runs(self):
+        """
+        Count the runs leased to workers that stopped calling as failed attempts.
+        """
+        with self.condition:
+            now = time.monotonic()
+            for run, worker in list(self.leases.items()):
+                if now - self.heartbeats[worker] > self.worker_timeout:
+                    self.fail(run, f'worker {worker} lost')
+
+    def wait(self, timeout) -> bool:
+        with self.condition:
+            return self.condition.wait_for(self.is_finished, timeout)
+
+    def get_rows(self) -> list:
+        with self.condition:
+            return [self.rows[run] for run in sorted(self.rows)]
+
+
+class Coordinator:
+    """
+    Serve the JobBoard of a sweep at address, from a thread of this process.
+    """
+    def __init__(self, config, runs, address, authkey, attempts=3, worker_timeout=30):
+        unknown = {key for overrides in runs for key in overrides} - set(config)
+        if unknown:
+            raise ValueError(f"Unknown configuration keys: {', '.join(sorted(unknown))}")
+        self.board = JobBoard(config, runs, attempts=attempts, worker_timeout=worker_timeout)
+        SweepManager.register('get_board', callable=lambda: self.board)
+        self.server = SweepManager(address=address, authkey=authkey).get_server()
+        self.address = self.server.address
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def __str__(self):
+        return f'Coordinator at {self.address[0]}:{self.address[1]}, {len(self.board.runs)} runs'
+
+    def collect(self, grace=2) -> list:
+        """
+        Wait for all runs, retrying those of lost workers, then stop serving after grace
+        seconds, in which waiting workers learn that the sweep is finished.
+
+        Returns:
+        list: Summary rows ordered by run, with an error column for the runs that failed.
+        """
+        while not self.board.wait(HEARTBEAT_INTERVAL):
+            self.board.release_lost_runs()
+        time.sleep(grace)
+        self.server.stop_event.set()
+        return self.board.get_rows()
+
+
+def parse_address(address) -> tuple:
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def connect_board(address, authkey):
+    SweepManager.register('get_board')
+    manager = SweepManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.get_board()
+
+
+def run_worker(address, authkey, handles=None):
+    """
+    Pull runs from the coordinator at address until the sweep is finished. A heartbeat
+    thread keeps the lease of the current run while it is simulated.
+
+    Parameters:
+    handles (dict): Handles of the space arrays published on this host, see sweep.publish_spaces().
+    """
+    initialize_worker(handles)
+    board = connect_board(address, authkey)
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    config = board.get_config()
+
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(HEARTBEAT_INTERVAL):
+                board.heartbeat(worker)
+        except (EOFError, ConnectionError):
+            pass
+
+    threading.Thread(target=beat, daemon=True).start()
+    try:
+        while (job := board.get_job(worker)) is not None:
+            run, overrides = job
+            try:
+                row = run_configuration(config, overrides, run)
+            except Exception as error:
+                board.put_failure(worker, run, repr(error))
+            else:
+                board.put_result(worker, run, {**row, 'worker': worker})
+    except (EOFError, ConnectionError):
+        print(f'{worker}: coordinator closed the connection')
+    finally:
+        stop.set()
+
+
+def start_workers(address, authkey, processes, published) -> list:
+    """
+    Start worker processes on this host, attaching the spaces published with sweep.publish_spaces().
+    """
+    handles = {key: shared_arrays.get_handles() for key, shared_arrays in published.items()}
+    workers = [multiprocessing.Process(target=run_worker, args=(address, authkey, handles))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def read_runs(config_filename, grid_filename) -> tuple:
+    with open(config_filename, 'r') as file:
+        config = json.load(file)
+    with open(grid_filename, 'r') as file:
+        runs = expand_grid(json.load(file))
+    return config, runs
+
+
+def report(rows):
+    data_storage = DataStorage('sweep', 0)
+    print(data_storage)
+    columns = get_columns(rows)
+    print_summary(rows, columns)
+    store_summary(rows, columns, data_storage)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='cluster', description='Parameter sweep over several hosts')
+    parser.add_argument('mode', choices=('serve', 'work', 'local'),
+                        help='coordinator, workers of a coordinator, or both on this host')
+    parser.add_argument('-c', '--config-file', dest='config_filename', default='config.json', help='')
+    parser.add_argument('-g', '--grid-file', dest='grid_filename', default='',
+                        help='JSON grid of configuration overrides')
+    parser.add_argument('-a', '--address', default='127.0.0.1:50000', help='host:port of the coordinator')
+    parser.add_argument('-k', '--authkey', default=None,
+                        help='shared secret of the coordinator, required by work, random if not given otherwise')
+    parser.add_argument('-w', '--workers', type=int, default=0, help='worker processes, by default one per core')
+    parser.add_argument('--attempts', type=int, default=3, help='tries of a run before it is reported as failed')
+    parser.add_argument('--worker-timeout', type=float, default=30,
+                        help='seconds without heartbeat after which the run of a worker is retried')
+    args = parser.parse_args()
+    if args.authkey is None:
+        if args.mode == 'work':
+            parser.error('work needs the authkey of the coordinator (-k)')
+        args.authkey = secrets.token_hex(16)
+        if args.mode == 'serve':
+            print(f'Authkey: {args.authkey}')
+    authkey = args.authkey.encode()
+
+    if args.mode == 'work':
+        address = parse_address(args.address)
+        board = connect_board(address, authkey)
+        config, runs = board.get_config(), board.get_runs()
+        processes = get_worker_count(args.workers)
+    else:
+        if not args.grid_filename:
+            parser.error(f'{args.mode} needs a grid file')
+        config, runs = read_runs(args.config_filename, args.grid_filename)
+        address = ('127.0.0.1', 0) if args.mode == 'local' else parse_address(args.address)
+        coordinator = Coordinator(config, runs, address, authkey,
+                                  attempts=args.attempts, worker_timeout=args.worker_timeout)
+        print(coordinator)
+        address = coordinator.address
+        processes = min(get_worker_count(args.workers), len(runs))
+
+    workers = []
+    # The static spaces are built once per host and shared with its worker processes
+    published = publish_spaces(config, runs) if args.mode != 'serve' and config['share_spaces'] else {}
+    try:
+        if args.mode != 'serve':
+            workers = start_workers(address, authkey, processes, published)
+        if args.mode != 'work':
+            rows = coordinator.collect(grace=0 if workers else 2)
+        for worker in workers:
+            worker.join()
+    finally:
+        for shared_arrays in published.values():
+            shared_arrays.close()
+    if args.mode != 'work':
+        report(rows)
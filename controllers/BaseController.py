@@ -6,19 +6,54 @@ from collections.abc import Sequence
 
 class BaseController(ABC):
     name = 'base_controller'
+    look_ahead = False  # implements get_hold_steps()
+    # Extra constructor arguments taken from the run configuration
+    config_arguments = ()
     def __init__(self, vehicles, sim_time: int, sample_time: float, space: BaseSpace):
         self.sample_time = sample_time
         self.sim_time = sim_time
         self.N = round(sim_time / sample_time) + 1
-        self.simTime = np.arange(start=0, stop=self.sample_time*self.N, step=sample_time)#[:, None]
+        self.simTime = np.arange(self.N) * sample_time
         self.space = space
         self.number_of_vehicles = len(vehicles)
         self.vehicles = vehicles
         self.colors = {vehicle.serial_number: vehicle.color for vehicle in vehicles}
         self.data_storage = None
 
-    def generate_control(self, positions, step) -> Sequence:
+    def generate_control(self, positions, step, time_step=None) -> Sequence:
         pass
 
+    def get_hold_steps(self, positions, step, controls) -> int:
+        """
+        Look ahead over the positions of the next samples, starting at sample step, reached
+        while controls are held. Count the leading samples at which generate_control() would
+        return controls again, and record them as generate_control() does.
+
+        Parameters:
+        positions (np.ndarray): Position/attitude arrays of shape (J, V, 6).
+        step (int): Sample of positions[0].
+        controls (np.ndarray): Held controls of shape (V, dimU).
+
+        Returns:
+        int: Number of samples.
+        """
+        raise NotImplementedError(f"The {self.name} controller cannot look ahead")
+
+    def get_proximity(self, step, previous_step=None) -> tuple:
+        """
+        Get what an adaptive step policy needs at a visited sample.
+
+        Returns:
+        tuple: Intensities relative to the target isoline, their rates of change, and whether
+            the control law of each vehicle switched since previous_step, all of shape (V,).
+        """
+        raise NotImplementedError(f"The {self.name} controller does not support adaptive steps")
+
+    def resample(self, steps):
+        """
+        Fill the records of the samples skipped between the visited steps.
+        """
+        raise NotImplementedError(f"The {self.name} controller does not support adaptive steps")
+
     def set_data_storage(self, data_storage) -> None:
         self.data_storage = data_storage
\ No newline at end of file
@@ -11,6 +11,7 @@ from numpy.ma.core import cumsum
 from .BaseController import BaseController
 from tools.random_generators import normalize
 from tools.random_generators import color_generator
+from lib.scheduler import resample_steps
 
 legendSize = 16
 legendSize1 = 10
@@ -28,18 +29,33 @@ def cm2inch(value):  # inch to cm
 
 class IntensityBasedController(BaseController):
     name = 'intensity'
-    def __init__(self, vehicles, sim_time: int, sample_time: float, space: BaseSpace, FPS=30, isolines=10, f0=0, mu=0.5):
+    look_ahead = True
+    config_arguments = ('FPS', 'isolines', 'f0', 'mu')
+    def __init__(self, vehicles, sim_time: int, sample_time: float, space: BaseSpace, FPS=30, isolines=10, f0=0, mu=0.5,
+                 keep_records=True):
+        """
+        keep_records: store the intensity, sigma and quality of every sample for the plots,
+        otherwise only those of the last sample are kept, in column 0.
+        """
         super().__init__(vehicles, sim_time, sample_time, space)
-        self.m_f_prev = [space.get_intensity(vehicle.starting_point[1], vehicle.starting_point[0]) for vehicle in vehicles]
+        starting_points = np.array([vehicle.starting_point for vehicle in vehicles], float)
+        self.m_f_prev = space.get_intensity_batch(starting_points[:, 1], starting_points[:, 0], t=0)
         self.f0 = f0
         self.mu = mu
         self.FPS = FPS
         self.isolines = isolines
-        self.intensity = np.zeros((self.number_of_vehicles, self.N), dtype=float)
-        self.der = np.zeros((self.number_of_vehicles, self.N), dtype=float)
-        self.mu_tanh = np.zeros((self.number_of_vehicles, self.N), dtype=float)
-        self.sigmas = np.zeros((self.number_of_vehicles, self.N), dtype=float)
-        self.quality_array = np.zeros((self.number_of_vehicles, self.N), dtype=float)
+        self.keep_records = keep_records
+        self.look_ahead = keep_records
+        columns = self.N if keep_records else 1
+        self.intensity = np.zeros((self.number_of_vehicles, columns), dtype=float)
+        self.der = np.zeros((self.number_of_vehicles, columns), dtype=float)
+        self.mu_tanh = np.zeros((self.number_of_vehicles, columns), dtype=float)
+        self.sigmas = np.zeros((self.number_of_vehicles, columns), dtype=float)
+        self.quality_array = np.zeros((self.number_of_vehicles, columns), dtype=float)
+        # [n_min, n_max] of every vehicle, by serial number
+        self.n_limits = np.zeros((self.number_of_vehicles, 2), dtype=float)
+        for vehicle in vehicles:
+            self.n_limits[vehicle.serial_number] = vehicle.n_min, vehicle.n_max
         self.type = 'Individual intensity based controller'
 
     def __str__(self):
@@ -50,36 +66,80 @@ class IntensityBasedController(BaseController):
                 f'Simulation time: {round(self.sim_time)} seconds\n'
                 f'Numbers of vehicles: {self.number_of_vehicles}')
 
-    def berman_law(self, vehicle, step, f_current, f_prev):
-        self.der[vehicle, step] = (f_current - f_prev) / self.sample_time
+    def berman_law(self, vehicle, step, f_current, f_prev, time_step=None):
+        self.der[vehicle, step] = (f_current - f_prev) / (time_step or self.sample_time)
         self.mu_tanh[vehicle, step] = self.mu * np.tanh(f_current - self.f0)
         self.sigmas[vehicle, step] = -np.sign(self.der[vehicle, step] + self.mu_tanh[vehicle, step])
         return self.sigmas[vehicle, step]
 
-    def generate_control(self, positions, step):
-        m_f_current = [self.space.get_intensity(eta[1], eta[0]) for eta in positions]
-        # self.quality_array.append([self.space.get_nearest_contour_point_norm(eta[0], eta[1]) for eta in positions])
-        controls = []
-        for vehicle in self.vehicles:
-            f_current = m_f_current[vehicle.serial_number]
-            #print(f_current)
-            f_prev = self.m_f_prev[vehicle.serial_number]
-            sigma = self.berman_law(vehicle.serial_number, step, f_current, f_prev)
-
-            if sigma < 0:
-                u_control = [vehicle.n_min, vehicle.n_max]
-            elif sigma > 0:
-                u_control = [vehicle.n_max, vehicle.n_min]
-            else:
-                u_control = [0, 0]
-            controls.append(u_control)
-            #print(u_control)
-            self.intensity[vehicle.serial_number, step] = f_current
-            self.quality_array[vehicle.serial_number, step] = self.space.get_nearest_contour_point_norm(positions[vehicle.serial_number][0], positions[vehicle.serial_number][1])
+    def generate_control(self, positions, step, time_step=None):
+        """
+        Get the propeller commands of all vehicles from their (V, 6) position/attitude array.
+        time_step is the time since the previous call, the sample time if not given.
+
+        Returns:
+        np.ndarray: Array of shape (V, 2), row k for the vehicle with serial number k.
+        """
+        etas = np.asarray(positions, float)
+        column = step if self.keep_records else 0
+        m_f_current = self.space.get_intensity_batch(etas[:, 1], etas[:, 0], t=step * self.sample_time)
+        self.quality_array[:, column] = self.space.get_nearest_contour_point_norm_batch(etas[:, 0], etas[:, 1],
+                                                                                        t=step * self.sample_time)
+        sigma = self.berman_law(np.arange(self.number_of_vehicles), column, m_f_current, self.m_f_prev, time_step)
+
+        # sigma < 0: [n_min, n_max], sigma > 0: [n_max, n_min], otherwise [0, 0]
+        controls = np.where((sigma < 0)[:, None], self.n_limits, self.n_limits[:, ::-1])
+        controls[sigma == 0] = 0
+        self.intensity[:, column] = m_f_current
 
         self.m_f_prev = m_f_current
         return controls
 
+    def get_hold_steps(self, positions, step, controls):
+        etas = np.asarray(positions, float)
+        samples = len(etas)
+        if self.space.time_varying:
+            # Sample by sample in time order, the isoline is extracted again every contour_interval
+            m_f = np.empty(etas.shape[:2])
+            quality = np.empty(etas.shape[:2])
+            for j, eta in enumerate(etas):
+                t = (step + j) * self.sample_time
+                m_f[j] = self.space.get_intensity_batch(eta[:, 1], eta[:, 0], t=t)
+                quality[j] = self.space.get_nearest_contour_point_norm_batch(eta[:, 0], eta[:, 1], t=t)
+        else:
+            m_f = self.space.get_intensity_batch(etas[:, :, 1], etas[:, :, 0], t=step * self.sample_time)
+            quality = None
+        m_f_prev = np.vstack((self.m_f_prev[None], m_f[:-1]))
+        # berman_law over all samples at once
+        der = (m_f - m_f_prev) / self.sample_time
+        mu_tanh = self.mu * np.tanh(m_f - self.f0)
+        sigma = -np.sign(der + mu_tanh)
+        sample_controls = np.where((sigma < 0)[:, :, None], self.n_limits, self.n_limits[:, ::-1])
+        sample_controls[sigma == 0] = 0
+        same = np.all(sample_controls == controls, axis=(1, 2))
+        held = samples if same.all() else int(np.argmin(same))
+        if held:
+            steps = slice(step, step + held)
+            self.der[:, steps] = der[:held].T
+            self.mu_tanh[:, steps] = mu_tanh[:held].T
+            self.sigmas[:, steps] = sigma[:held].T
+            self.intensity[:, steps] = m_f[:held].T
+            if quality is None:
+                quality = self.space.get_nearest_contour_point_norm_batch(etas[:held, :, 0], etas[:held, :, 1])
+            self.quality_array[:, steps] = quality[:held].T
+            self.m_f_prev = m_f[held - 1]
+        return held
+
+    def get_proximity(self, step, previous_step=None):
+        return (self.intensity[:, step], self.der[:, step],
+                np.zeros(self.number_of_vehicles, bool) if previous_step is None
+                else self.sigmas[:, step] != self.sigmas[:, previous_step])
+
+    def resample(self, steps):
+        for records in (self.intensity, self.der, self.mu_tanh, self.quality_array):
+            resample_steps(records, steps)
+        resample_steps(self.sigmas, steps, hold=True)
+
     def plotting_sigma(self, store_plot=False, **arguments):
         # print(np.array(self.der).shape)
         # print(np.array(self.mu_tanh).shape)
@@ -183,8 +243,8 @@ class IntensityBasedController(BaseController):
         plt.xlabel('X,m / East')
         plt.ylabel('Y,m / North')
         # plt.colorbar(contour, label='Intensity')  # Add a color bar for reference
-        plt.contour(self.space.get_X(), self.space.get_Y(), self.space.get_Z(), levels=[self.space.target_isoline],
-                    colors='red')  # Intersection line
+        for isoline in self.space.get_isolines():  # Intersection line
+            plt.plot(isoline[:, 0], isoline[:, 1], color='red')
 
         # Animation function
         def anim_function(num, plotData):
@@ -202,9 +262,10 @@ class IntensityBasedController(BaseController):
             y = simData[:, 1]
             z = simData[:, 2]
             # down-sampling the xyz data points
-            N = y[::len(x) // self.space.grid_size];
-            E = x[::len(x) // self.space.grid_size];
-            D = z[::len(x) // self.space.grid_size];
+            stride = max(len(x) // self.space.grid_size, 1)
+            N = y[::stride];
+            E = x[::stride];
+            D = z[::stride];
 
             dataSet = np.array([N, E, -D])  # Down is negative z
             # Highlight the first point with an asterisk
@@ -9,11 +9,13 @@ def register_class(cls):
     controller_instance[cls.name] = cls
     return cls
 
-def create_instance(class_name: str, **arguments) -> BaseController:
+def get_class(class_name: str) -> type:
     if class_name in controller_instance:
-        return controller_instance[class_name](**arguments)
-    else:
-        raise ValueError(f"Unknown class name: {class_name}")
+        return controller_instance[class_name]
+    raise ValueError(f"Unknown class name: {class_name}")
+
+def create_instance(class_name: str, **arguments) -> BaseController:
+    return get_class(class_name)(**arguments)
 
 register_class(SwarmController)
 register_class(IntensityBasedController)
\ No newline at end of file
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ensemble.py: Monte-Carlo robustness study. Every vehicle type of the configuration is
+    simulated from K random start points and headings, optionally with perturbed currents,
+    as one swarm without interaction, and only the distance statistics are kept:
+        python ensemble.py -c config.json -k 5000
+"""
+import json
+import argparse
+import numpy as np
+from lib import draw_members, ensemble_simulate, get_ensemble_summary
+from tools import DataStorage, read_and_assign_arguments
+from main import create_controller, create_space, create_vehicles
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='ensemble', description='Monte-Carlo robustness study')
+    parser.add_argument('-c', '--config-file', dest='config_filename', default='config.json', help='')
+    parser.add_argument('-k', '--members', type=int, default=None, help='members per vehicle type')
+    args = parser.parse_args()
+
+    arguments = read_and_assign_arguments(args.config_filename)
+    members = args.members or arguments.ensemble_members
+    space = create_space(arguments)
+    print(space)
+    data_storage = DataStorage(f'ensemble_{space.type}', 0)
+    print(data_storage)
+
+    # One template vehicle of every type, at the origin
+    arguments.vehicles = 1
+    summaries = {}
+    for template in create_vehicles(arguments):
+        ensemble = draw_members(template, members, arguments.radius,
+                                beta_current=arguments.beta_current,
+                                V_current_std=arguments.ensemble_V_current_std,
+                                beta_current_std=arguments.ensemble_beta_current_std,
+                                seed=arguments.ensemble_seed)
+        controller = create_controller(arguments, ensemble, space, keep_records=False)
+        results = ensemble_simulate(controller, arguments.capture_distance)
+        np.savez(data_storage.get_path(f'ensemble_{template.name}', 'npz'), **results)
+        summaries[template.name] = get_ensemble_summary(results)
+
+    columns = list(next(iter(summaries.values())))
+    print(f'{"vehicle":<10}' + ''.join(f'{column:>20}' for column in columns))
+    for name, summary in summaries.items():
+        print(f'{name:<10}' + ''.join(f'{summary[column]:>20.4g}' for column in columns))
+    with open(data_storage.get_path('ensemble_summary', 'json'), 'w') as file:
+        json.dump({name: {key: float(value) for key, value in summary.items()} for name, summary in summaries.items()},
+                  file, indent=4)
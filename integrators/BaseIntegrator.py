@@ -0,0 +1,44 @@
+import numpy as np
+from abc import ABC
+from math import ceil
+
+
+class BaseIntegrator(ABC):
+    name = 'base_integrator'
+    def __init__(self, time_step=0, tolerance=1e-6):
+        """
+        Propagate a batch of vehicles over one controller sample, the control inputs being
+        held constant over the sample.
+
+        Parameters:
+        time_step (float): Longest physics step (s), 0 takes one step per controller sample.
+        tolerance (float): Relative and absolute error tolerance of the adaptive integrators.
+        """
+        self.time_step = time_step
+        self.tolerance = tolerance
+        self.evaluations = 0  # calls of the vehicle model
+
+    def __str__(self):
+        return self.name + (f', steps up to {self.time_step} s' if self.time_step else ', one step per sample')
+
+    def get_substeps(self, sample_time) -> int:
+        """
+        Number of equal steps of at most time_step that cover one sample.
+        """
+        if not self.time_step:
+            return 1
+        return max(ceil(sample_time / self.time_step - 1e-9), 1)
+
+    def integrate(self, vehicle, eta, nu, u_actual, u_control, sample_time) -> tuple:
+        """
+        [eta, nu, u_actual] = integrate(vehicle, eta, nu, u_actual, u_control, sample_time)
+        propagates the rows of a batch of vehicles sharing the parameters of vehicle.
+        """
+        pass
+
+    def get_state_derivatives(self, vehicle, y, u_control, dof):
+        """
+        Evaluate the continuous-time model on the packed state y = [eta | nu | u_actual].
+        """
+        self.evaluations += 1
+        return np.hstack(vehicle.get_derivatives_batch(y[:, :dof], y[:, dof:2 * dof], y[:, 2 * dof:], u_control))
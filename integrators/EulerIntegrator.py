@@ -0,0 +1,14 @@
+from .BaseIntegrator import BaseIntegrator
+
+
+class EulerIntegrator(BaseIntegrator):
+    name = 'euler'
+    def integrate(self, vehicle, eta, nu, u_actual, u_control, sample_time) -> tuple:
+        """
+        Forward Euler through the discrete dynamics and repositioning of the vehicle class.
+        """
+        substeps = self.get_substeps(sample_time)
+        for _ in range(substeps):
+            eta, nu, u_actual = vehicle.euler_step_batch(eta, nu, u_actual, u_control, sample_time / substeps)
+        self.evaluations += substeps
+        return eta, nu, u_actual
@@ -0,0 +1,68 @@
+import numpy as np
+from .BaseIntegrator import BaseIntegrator
+
+# Dormand-Prince 5(4) tableau
+DORMAND_PRINCE_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+# Fifth order weights (the last row of DORMAND_PRINCE_A) minus the embedded fourth order weights
+DORMAND_PRINCE_E = np.array([71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40])
+
+
+class RK45Integrator(BaseIntegrator):
+    name = 'rk45'
+    def __init__(self, time_step=0, tolerance=1e-6):
+        """
+        Adaptive Dormand-Prince 5(4) with the step size controlled by the embedded error
+        estimate. The whole batch shares one step, accepted when the largest error of all
+        its states is below tolerance * (1 + |y|). The step size is kept between samples.
+        """
+        super().__init__(time_step, tolerance)
+        self.step_size = None
+        self.rejected = 0
+
+    def __str__(self):
+        return (f'{self.name}, tolerance {self.tolerance}'
+                + (f', steps up to {self.time_step} s' if self.time_step else ', steps up to one sample'))
+
+    def integrate(self, vehicle, eta, nu, u_actual, u_control, sample_time) -> tuple:
+        dof = eta.shape[1]
+        y = np.hstack((eta, nu, u_actual))
+        h_max = min(self.time_step, sample_time) if self.time_step else sample_time
+        if self.step_size is None:
+            self.step_size = h_max
+        t = 0
+        k1 = self.get_state_derivatives(vehicle, y, u_control, dof)
+        while t < sample_time:
+            h = min(self.step_size, h_max, sample_time - t)
+            k = [k1]
+            for a in DORMAND_PRINCE_A[1:]:
+                k.append(self.get_state_derivatives(vehicle, y + h * sum(a_j * k_j for a_j, k_j in zip(a, k)),
+                                                    u_control, dof))
+            # First same as last: the last stage is evaluated at the fifth order solution
+            y_next = y + h * sum(a_j * k_j for a_j, k_j in zip(DORMAND_PRINCE_A[-1], k))
+            error = h * np.tensordot(DORMAND_PRINCE_E, np.array(k), axes=1)
+            scale = self.tolerance * (1 + np.maximum(np.abs(y), np.abs(y_next)))
+            error = np.max(np.abs(error) / scale) if y.size else 0
+            factor = min(max(0.9 * error ** -0.2, 0.2), 5) if error > 0 else 5
+            if not np.isfinite(error):
+                factor = 0.2
+            if error <= 1:
+                t += h
+                y = y_next
+                k1 = k[-1]
+                if h < self.step_size and t >= sample_time:
+                    # Cut short by the end of the sample, do not shrink the next step
+                    self.step_size = max(self.step_size, h * factor)
+                else:
+                    self.step_size = h * factor
+            else:
+                self.rejected += 1
+                self.step_size = h * factor
+        return y[:, :dof], y[:, dof:2 * dof], y[:, 2 * dof:]
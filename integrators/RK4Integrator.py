@@ -0,0 +1,21 @@
+import numpy as np
+from .BaseIntegrator import BaseIntegrator
+
+
+class RK4Integrator(BaseIntegrator):
+    name = 'rk4'
+    def integrate(self, vehicle, eta, nu, u_actual, u_control, sample_time) -> tuple:
+        """
+        Classical fourth order Runge-Kutta in equal steps of at most time_step.
+        """
+        dof = eta.shape[1]
+        y = np.hstack((eta, nu, u_actual))
+        substeps = self.get_substeps(sample_time)
+        h = sample_time / substeps
+        for _ in range(substeps):
+            k1 = self.get_state_derivatives(vehicle, y, u_control, dof)
+            k2 = self.get_state_derivatives(vehicle, y + h / 2 * k1, u_control, dof)
+            k3 = self.get_state_derivatives(vehicle, y + h / 2 * k2, u_control, dof)
+            k4 = self.get_state_derivatives(vehicle, y + h * k3, u_control, dof)
+            y = y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        return y[:, :dof], y[:, dof:2 * dof], y[:, 2 * dof:]
@@ -0,0 +1,21 @@
+from .BaseIntegrator import *
+from .EulerIntegrator import *
+from .RK4Integrator import *
+from .RK45Integrator import *
+
+integrator_instance = {}
+
+# Register decorator
+def register_class(cls):
+    integrator_instance[cls.name] = cls
+    return cls
+
+def create_instance(class_name: str, **arguments) -> BaseIntegrator:
+    if class_name in integrator_instance:
+        return integrator_instance[class_name](**arguments)
+    else:
+        raise ValueError(f"Unknown class name: {class_name}")
+
+register_class(EulerIntegrator)
+register_class(RK4Integrator)
+register_class(RK45Integrator)
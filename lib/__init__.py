@@ -4,6 +4,7 @@
 from .gnc import *
 from .mainLoop import *
 from .simultaneousLoop import *
+from .ensemble import *
 from .plotTimeSeries import *
 from .guidance import *
 from .models import *
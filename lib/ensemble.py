@@ -0,0 +1,119 @@
+import copy
+import numpy as np
+from tqdm import tqdm
+from .swarmState import SwarmState
+
+
+def draw_members(vehicle, members, radius, beta_current=0, V_current_std=0, beta_current_std=0, seed=0) -> list:
+    """
+    Draw the members of an ensemble as copies of a vehicle sharing its model constants: start
+    points uniform over a disc of the given radius around its own, uniform headings and,
+    for vehicles with a current model, normally perturbed currents.
+
+    Parameters:
+    vehicle (Vehicle): Template vehicle.
+    members (int): Number of members K.
+    radius (float): Radius of the start point disc (m).
+    beta_current (float): Mean current direction (deg).
+    V_current_std (float): Standard deviation of the current speed (m/s), clipped at 0.
+    beta_current_std (float): Standard deviation of the current direction (deg).
+    seed (int): Seed of the random draws.
+
+    Returns:
+    list: K vehicles with serial numbers 0 to K - 1.
+    """
+    rng = np.random.default_rng(seed)
+    distance = radius * np.sqrt(rng.uniform(size=members))
+    angle = rng.uniform(0, 2 * np.pi, members)
+    heading = rng.uniform(0, 2 * np.pi, members)
+    V_c = np.maximum(vehicle.V_c + V_current_std * rng.standard_normal(members), 0)
+    beta_c = np.deg2rad(beta_current + beta_current_std * rng.standard_normal(members))
+    ensemble = []
+    for k in range(members):
+        member = copy.copy(vehicle)
+        member.serial_number = k
+        member.starting_point = vehicle.starting_point + distance[k] * np.array([np.cos(angle[k]), np.sin(angle[k])])
+        member.starting_heading = heading[k]
+        member.V_c = V_c[k]
+        if hasattr(vehicle, 'beta_c'):
+            member.beta_c = beta_c[k]
+        ensemble.append(member)
+    return ensemble
+
+
+def ensemble_simulate(controller, capture_distance) -> dict:
+    """
+    Simulate the members of an ensemble as one swarm without interaction, keeping only the
+    distance statistics of every member instead of its trajectory. controller must not keep
+    records (keep_records=False), its quality is the distance to the target isoline.
+
+    Parameters:
+    controller (IntensityBasedController): Controller of the members.
+    capture_distance (float): Distance to the isoline that counts as captured (m).
+
+    Returns:
+    dict: Arrays of shape (K,): capture_time (s, nan if never captured), tracking_error
+        (mean distance after the capture, m), final_distance (m) and converged (captured
+        and within capture_distance at the end).
+    """
+    state = SwarmState(controller.vehicles)
+    members = state.number_of_vehicles
+    capture_time = np.full(members, np.nan)
+    distance_sum = np.zeros(members)
+    distance_count = np.zeros(members)
+    for i in tqdm(range(0, controller.N), desc=f"Ensemble x{members}"):
+        state.u_control[:] = controller.generate_control(state.eta, i)
+        distance = controller.quality_array[:, 0]
+        capture_time[np.isnan(capture_time) & (distance < capture_distance)] = i * controller.sample_time
+        captured = ~np.isnan(capture_time)
+        distance_sum[captured] += distance[captured]
+        distance_count += captured
+        state.step(controller.sample_time)
+    with np.errstate(invalid='ignore'):
+        tracking_error = distance_sum / distance_count
+    return {'capture_time': capture_time,
+            'tracking_error': tracking_error,
+            'final_distance': distance,
+            'converged': ~np.isnan(capture_time) & (distance < capture_distance)}
+
+
+def get_track_statistics(distance, sample_time, capture_distance) -> dict:
+    """
+    The statistics of ensemble_simulate from recorded distances to the target isoline.
+
+    Parameters:
+    distance (np.ndarray): Distances of shape (K, N), column i at sample i (m).
+    sample_time (float): Controller sample time (s).
+    capture_distance (float): Distance to the isoline that counts as captured (m).
+
+    Returns:
+    dict: See ensemble_simulate().
+    """
+    within = distance < capture_distance
+    captured = within.any(axis=1)
+    first = np.argmax(within, axis=1)
+    capture_time = np.where(captured, first * sample_time, np.nan)
+    after = captured[:, None] & (np.arange(distance.shape[1]) >= first[:, None])
+    with np.errstate(invalid='ignore'):
+        tracking_error = np.where(after, distance, 0).sum(axis=1) / after.sum(axis=1)
+    return {'capture_time': capture_time,
+            'tracking_error': tracking_error,
+            'final_distance': distance[:, -1],
+            'converged': captured & within[:, -1]}
+
+
+def get_ensemble_summary(results) -> dict:
+    """
+    Distribution statistics of ensemble_simulate results: fractions of captured and converged
+    members, and percentiles of the capture time and tracking error of the captured ones.
+    """
+    captured = ~np.isnan(results['capture_time'])
+    summary = {'members': len(captured),
+               'captured': captured.mean(),
+               'converged': results['converged'].mean()}
+    for name in ('capture_time', 'tracking_error'):
+        values = results[name][captured]
+        for percentile in (10, 50, 90):
+            summary[f'{name}_p{percentile}'] = np.percentile(values, percentile) if len(values) else np.nan
+        summary[f'{name}_mean'] = values.mean() if len(values) else np.nan
+    return summary
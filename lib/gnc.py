@@ -97,6 +97,29 @@ def Rzyx(phi, theta, psi):
     return R
 
 
+#------------------------------------------------------------------------------
+
+def RzyxBatch(phi, theta, psi):
+    """
+    R = RzyxBatch(phi,theta,psi) computes the Euler angle rotation matrices of
+    arrays of angles of shape (V,), returning shape (V, 3, 3)
+    """
+
+    cphi = np.cos(phi)
+    sphi = np.sin(phi)
+    cth = np.cos(theta)
+    sth = np.sin(theta)
+    cpsi = np.cos(psi)
+    spsi = np.sin(psi)
+
+    R = np.stack([
+        np.stack([cpsi * cth, -spsi * cphi + cpsi * sth * sphi, spsi * sphi + cpsi * cphi * sth], axis=-1),
+        np.stack([spsi * cth, cpsi * cphi + sphi * sth * spsi, -cpsi * sphi + sth * spsi * cphi], axis=-1),
+        np.stack([-sth, cth * sphi, cth * cphi], axis=-1)], axis=-2)
+
+    return R
+
+
 #------------------------------------------------------------------------------
 
 def Tzyx(phi, theta):
@@ -122,6 +145,28 @@ def Tzyx(phi, theta):
     return T
 
 
+#------------------------------------------------------------------------------
+
+def TzyxBatch(phi, theta):
+    """
+    T = TzyxBatch(phi,theta) computes the Euler angle attitude transformation
+    matrices of arrays of angles of shape (V,), returning shape (V, 3, 3)
+    """
+
+    cphi = np.cos(phi)
+    sphi = np.sin(phi)
+    cth = np.cos(theta)
+    sth = np.sin(theta)
+    zero = np.zeros_like(phi)
+
+    T = np.stack([
+        np.stack([zero + 1, sphi * sth / cth, cphi * sth / cth], axis=-1),
+        np.stack([zero, cphi, -sphi], axis=-1),
+        np.stack([zero, sphi / cth, cphi / cth], axis=-1)], axis=-2)
+
+    return T
+
+
 #------------------------------------------------------------------------------
 
 def attitudeEuler(eta, nu, sampleTime):
@@ -140,6 +185,32 @@ def attitudeEuler(eta, nu, sampleTime):
     return eta
 
 
+#------------------------------------------------------------------------------
+
+def attitudeRatesBatch(eta, nu):
+    """
+    eta_dot = attitudeRatesBatch(eta,nu) computes the time derivatives of the
+    generalized positions/Euler angles of many vehicles from (V, 6) arrays eta and nu
+    """
+
+    p_dot = np.einsum('vij,vj->vi', RzyxBatch(eta[:, 3], eta[:, 4], eta[:, 5]), nu[:, 0:3])
+    v_dot = np.einsum('vij,vj->vi', TzyxBatch(eta[:, 3], eta[:, 4]), nu[:, 3:6])
+
+    return np.hstack((p_dot, v_dot))
+
+
+#------------------------------------------------------------------------------
+
+def attitudeEulerBatch(eta, nu, sampleTime):
+    """
+    eta = attitudeEulerBatch(eta,nu,sampleTime) computes eta[k+1] of many vehicles
+    at once from (V, 6) arrays eta and nu
+    """
+
+    # Forward Euler integration
+    return eta + sampleTime * attitudeRatesBatch(eta, nu)
+
+
 #------------------------------------------------------------------------------
 
 def m2c(M, nu):
@@ -207,6 +278,55 @@ def Hoerner(B, T):
     return CY_2D
 
 
+#------------------------------------------------------------------------------
+
+def crossFlowStripSums(v_r, r, x0, dx, n):
+    """
+    [S0, S1] = crossFlowStripSums(v_r,r,x0,dx,n) computes the strip sums
+        S0 = sum_i |v_r + x_i r| (v_r + x_i r),  S1 = sum_i x_i |v_r + x_i r| (v_r + x_i r)
+    over the strips x_i = x0 + i dx, i = 0..n, in closed form. With u_i = alpha + beta i
+    the sign of u_i changes at most once, at m = ceil(-alpha / beta), so both sums are
+    +-(sum over all strips - 2 * sum over the strips i < m) of polynomials in i, and the
+    power sums of i have closed forms. v_r and r may be floats or arrays of equal shape.
+    """
+
+    if np.ndim(v_r) and np.size(v_r) == 1:  # a single vehicle is cheaper with floats than with ufuncs
+        S0, S1 = crossFlowStripSums(np.asarray(v_r).item(), np.asarray(r).item(), x0, dx, n)
+        return np.full(np.shape(v_r), S0), np.full(np.shape(v_r), S1)
+
+    alpha = v_r + x0 * r
+    beta = dx * r
+    if np.ndim(alpha) == 0:
+        if beta != 0:
+            sign = math.copysign(1, beta)
+            m = min(max(math.ceil(-alpha / beta), 0), n + 1)
+        else:
+            sign = math.copysign(1, alpha) if alpha else 0.0
+            m = 0
+    else:
+        moving = beta != 0
+        sign = np.sign(np.where(moving, beta, alpha))
+        m = np.minimum(np.maximum(np.ceil(-alpha / np.where(moving, beta, 1)), 0), n + 1) * moving
+
+    # Power sums sum_{i<k} i^p of all strips (k = n + 1) and of the first m strips
+    k = n + 1
+    K1 = k * (k - 1) / 2
+    K2 = K1 * (2 * k - 1) / 3
+    P1 = m * (m - 1) / 2
+    P2 = P1 * (2 * m - 1) / 3
+    D1 = K1 - 2 * P1
+    D2 = K2 - 2 * P2
+
+    # u_i^2 = alpha^2 + 2 alpha beta i + beta^2 i^2
+    aa = alpha * alpha
+    ab2 = 2 * alpha * beta
+    bb = beta * beta
+    S0 = sign * (aa * (k - 2 * m) + ab2 * D1 + bb * D2)
+    S1 = x0 * S0 + dx * sign * (aa * D1 + ab2 * D2 + bb * (K1 * K1 - 2 * P1 * P1))
+
+    return S0, S1
+
+
 #------------------------------------------------------------------------------
 
 def crossFlowDrag(L, B, T, nu_r):
@@ -223,6 +343,30 @@ def crossFlowDrag(L, B, T, nu_r):
     dx = L / 20
     Cd_2D = Hoerner(B, T)  # 2D drag coefficient based on Hoerner's curve
 
+    # Strip sums over xL = -L/2 .. L/2, see crossFlowDragStrips()
+    S0, S1 = crossFlowStripSums(nu_r[1], nu_r[5], -L / 2, dx, n)
+    Yh = -0.5 * rho * T * Cd_2D * dx * S0  # sway force
+    Nh = -0.5 * rho * T * Cd_2D * dx * S1  # yaw moment
+
+    tau_crossflow = np.array([0, Yh, 0, 0, 0, Nh], float)
+
+    return tau_crossflow
+
+
+#------------------------------------------------------------------------------
+
+def crossFlowDragStrips(L, B, T, nu_r):
+    """
+    tau_crossflow = crossFlowDragStrips(L,B,T,nu_r) is the strip by strip
+    reference implementation of crossFlowDrag()
+    """
+
+    rho = 1026  # density of water
+    n = 20  # number of strips
+
+    dx = L / 20
+    Cd_2D = Hoerner(B, T)  # 2D drag coefficient based on Hoerner's curve
+
     Yh = 0
     Nh = 0
     xL = -L / 2
@@ -240,6 +384,29 @@ def crossFlowDrag(L, B, T, nu_r):
     return tau_crossflow
 
 
+#------------------------------------------------------------------------------
+
+def crossFlowDragBatch(L, B, T, nu_r):
+    """
+    tau_crossflow = crossFlowDragBatch(L,B,T,nu_r) computes the cross-flow drag
+    integrals of many relative velocity vectors at once, nu_r of shape (V, 6)
+    """
+
+    rho = 1026  # density of water
+    n = 20  # number of strips
+
+    dx = L / 20
+    Cd_2D = Hoerner(B, T)  # 2D drag coefficient based on Hoerner's curve
+
+    S0, S1 = crossFlowStripSums(nu_r[:, 1], nu_r[:, 5], -L / 2, dx, n)
+
+    tau_crossflow = np.zeros((len(nu_r), 6))
+    tau_crossflow[:, 1] = -0.5 * rho * T * Cd_2D * dx * S0  # sway force
+    tau_crossflow[:, 5] = -0.5 * rho * T * Cd_2D * dx * S1  # yaw moment
+
+    return tau_crossflow
+
+
 #------------------------------------------------------------------------------
 
 def forceLiftDrag(b, S, CD_0, alpha, U_r):
@@ -0,0 +1,113 @@
+import numpy as np
+
+
+class Scheduler:
+    """
+    Multi-rate schedule of a simulation on a grid of physics ticks. The controller runs every
+    control_ticks ticks and the states are logged every log_ticks ticks. Between two of these
+    events the vehicles are propagated in one integrator call, in steps of at most one tick.
+    """
+    def __init__(self, sample_time, samples, physics_time_step=0, log_time_step=0):
+        """
+        Parameters:
+        sample_time (float): Controller sample time (s).
+        samples (int): Number of controller samples.
+        physics_time_step (float): Physics tick (s), rounded to divide sample_time, 0 for one tick per sample.
+        log_time_step (float): Logging interval (s), rounded to a multiple of the tick, 0 logs every sample.
+        """
+        self.control_ticks = max(round(sample_time / physics_time_step), 1) if physics_time_step else 1
+        self.tick = sample_time / self.control_ticks
+        self.log_ticks = max(round(log_time_step / self.tick), 1) if log_time_step else self.control_ticks
+        self.ticks = (samples - 1) * self.control_ticks
+        self.log_samples = self.ticks // self.log_ticks + 1
+        self.log_time = np.arange(self.log_samples) * self.log_ticks * self.tick
+
+    def __str__(self):
+        return (f'---scheduler-------------------------------------------------------------------------\n'
+                f'Physics tick: {self.tick} seconds\n'
+                f'Control: every {self.control_ticks} ticks\n'
+                f'Logging: every {self.log_ticks} ticks, {self.log_samples} samples')
+
+    def get_events(self):
+        """
+        Walk the control and logging events in time order.
+
+        Returns:
+        generator: (control step or None, log row or None, ticks until the next event) per event.
+        """
+        events = np.union1d(np.arange(0, self.ticks + 1, self.control_ticks),
+                            np.arange(0, self.ticks + 1, self.log_ticks))
+        following = np.append(events[1:], events[-1] + self.control_ticks)
+        for event, next_event in zip(events.tolist(), following.tolist()):
+            yield (event // self.control_ticks if event % self.control_ticks == 0 else None,
+                   event // self.log_ticks if event % self.log_ticks == 0 else None,
+                   next_event - event)
+
+    def get_event_count(self) -> int:
+        return len(np.union1d(np.arange(0, self.ticks + 1, self.control_ticks),
+                              np.arange(0, self.ticks + 1, self.log_ticks)))
+
+
+class ProximityStepPolicy:
+    """
+    Adaptive controller sample of the whole swarm, in whole controller samples. Every vehicle
+    may move for safety * |f| / |df/dt| before the next control update, f being its intensity
+    relative to the target isoline, so the steps grow while the swarm cruises far from the
+    isoline and shrink as a vehicle approaches it. After a sigma switch of any vehicle the
+    swarm falls back to single samples.
+    """
+    def __init__(self, sample_time, max_time_step, safety=0.1):
+        """
+        Parameters:
+        sample_time (float): Controller sample time (s), the shortest step.
+        max_time_step (float): Longest step (s).
+        safety (float): Fraction of the time to reach the isoline covered by one step.
+        """
+        self.max_samples = max(int(max_time_step / sample_time + 1e-9), 1)
+        self.safety = safety
+
+    def __str__(self):
+        return f'Adaptive steps: 1 to {self.max_samples} samples, safety {self.safety}'
+
+    def get_samples(self, intensity, derivative, switched, sample_time) -> int:
+        """
+        Parameters:
+        intensity (np.ndarray): Intensities relative to the target isoline, shape (V,).
+        derivative (np.ndarray): Their rates of change (1/s), shape (V,).
+        switched (np.ndarray): Whether sigma of each vehicle just switched, shape (V,).
+
+        Returns:
+        int: Number of controller samples until the next control update.
+        """
+        if np.any(switched):
+            return 1
+        with np.errstate(divide='ignore'):
+            horizon = np.min(self.safety * np.abs(intensity) / np.abs(derivative)) if len(intensity) else np.inf
+        if not horizon >= sample_time:
+            return 1
+        return int(min(horizon / sample_time, self.max_samples))
+
+
+def resample_steps(data, steps, hold=False):
+    """
+    Fill the samples of data between the visited steps, in place.
+
+    Parameters:
+    data (np.ndarray): Array of shape (V, N, ...) with valid samples at steps.
+    steps (array_like): Increasing sample indices, starting at 0 and ending at N - 1.
+    hold (bool): Hold the last visited value instead of interpolating linearly.
+
+    Returns:
+    np.ndarray: data.
+    """
+    steps = np.asarray(steps)
+    samples = np.arange(data.shape[1])
+    position = np.searchsorted(steps, samples, side='right') - 1
+    left = steps[position]
+    right = steps[np.minimum(position + 1, len(steps) - 1)]
+    if hold:
+        data[:] = data[:, left]
+        return data
+    weight = ((samples - left) / np.maximum(right - left, 1)).reshape((1, -1) + (1,) * (data.ndim - 2))
+    data[:] = data[:, left] * (1 - weight) + data[:, right] * weight
+    return data
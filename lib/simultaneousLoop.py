@@ -1,59 +1,119 @@
-
 import numpy as np
-from collections.abc import Sequence
 from vehicles import *
-from .gnc import attitudeEuler
+from .swarmState import SwarmState, DOF
+from .scheduler import Scheduler, ProximityStepPolicy
 from tqdm import tqdm
 from controllers import BaseController
 
 
-def simultaneous_simulate(controller: BaseController):
-    DOF = 6  # degrees of freedom
-    t = 0  # initial simulation time
+MAX_HORIZON = 512  # samples propagated at once by event_simulate
 
-    m_nu = []
-    m_u_actual = []
-    m_eta = []
 
-    # Initial state vectors
-    for vehicle in controller.vehicles:
-        # position/attitude, user editable
-        m_eta.append(np.array([vehicle.starting_point[1], vehicle.starting_point[0], 0, 0, 0, 0], float))
+def simultaneous_simulate(controller: BaseController, scheduler: Scheduler = None,
+                          step_policy: ProximityStepPolicy = None):
+    # Control, physics and logging rates, by default all at the controller sample time
+    if scheduler is None:
+        scheduler = Scheduler(controller.sample_time, controller.N)
 
-        # velocity, defined by vehicle class
-        m_nu.append(vehicle.nu)
+    # Initial state vectors
+    state = SwarmState(controller.vehicles)
 
-        # actual inputs, defined by vehicle class
-        m_u_actual.append(vehicle.u_actual)
+    # Initialization of table used to store the simulation data, sim_data[k] belongs to vehicle k
+    sim_data = np.empty([state.number_of_vehicles, scheduler.log_samples, 2 * DOF + 2 * state.dimU], float)
 
-    # Initialization of table used to store the simulation data
-    sim_data = [np.empty([controller.N, 2 * DOF + 2 * vehicle.dimU], float) for vehicle in controller.vehicles]
+    if step_policy is not None:
+        if scheduler.log_ticks % scheduler.control_ticks:
+            raise ValueError("Adaptive steps need a logging interval that is a multiple of the sample time")
+        sim_data = np.empty([state.number_of_vehicles, controller.N, 2 * DOF + 2 * state.dimU], float)
+        return adaptive_simulate(controller, state, sim_data, step_policy)[:, ::scheduler.log_ticks // scheduler.control_ticks]
+    if state.is_closed_form() and controller.look_ahead and scheduler.log_ticks == scheduler.control_ticks:
+        return event_simulate(controller, state, sim_data)
 
     # Simulator for-loop
-    for i in tqdm(range(0, controller.N), desc=f"Vehicle Simulation x{controller.number_of_vehicles}"):
+    for step, row, ticks in tqdm(scheduler.get_events(), total=scheduler.get_event_count(),
+                                 desc=f"Vehicle Simulation x{controller.number_of_vehicles}"):
 
-        m_u_control = controller.generate_control(m_eta, i)
+        if step is not None:
+            state.u_control[:] = controller.generate_control(state.eta, step)
 
-        for vehicle in controller.vehicles:
-            eta = m_eta[vehicle.serial_number]
-            nu = m_nu[vehicle.serial_number]
-            u_actual = m_u_actual[vehicle.serial_number]
-            u_control = m_u_control[vehicle.serial_number]
+        # Store simulation data in simData
+        if row is not None:
+            state.get_signals(out=sim_data[:, row, :])
 
-            # t = i * sample_time  # simulation time
-            # Store simulation data in simData
-            signals = np.hstack((eta, nu, u_control, u_actual))
-            sim_data[vehicle.serial_number][i, :] = signals
+        # Propagate vehicle attitude and  dynamics
+        state.step(ticks * scheduler.tick)
 
-            # Propagate vehicle attitude and  dynamics
-            [nu, u_actual] = vehicle.dynamics(eta, nu, u_actual, u_control, controller.sample_time)
-            eta = vehicle.repositioning(eta, nu, controller.sample_time)
+    return sim_data
 
-            m_eta[vehicle.serial_number] = eta
-            m_nu[vehicle.serial_number] = nu
-            m_u_actual[vehicle.serial_number] = u_actual
 
-    # Store simulation time vector
-    # controller.set_sim_time(np.arange(start=0, stop=t + sample_time, step=sample_time)[:, None])
+def event_simulate(controller: BaseController, state: SwarmState, sim_data):
+    """
+    Simulate vehicles whose motion under held controls is known in closed form. After every
+    control switch the trajectories are propagated over a horizon of samples at once, the
+    controller finds the next sample where the controls switch, and all samples before it are
+    stored without stepping. The horizon doubles while no switch is found and restarts from
+    the number of held samples after a switch.
+    """
+    sample_time = controller.sample_time
+    dimU = state.dimU
+    horizon = 1
+    i = 0
+    with tqdm(total=controller.N, desc=f"Vehicle Simulation x{controller.number_of_vehicles}") as progress:
+        while i < controller.N:
+            state.u_control[:] = controller.generate_control(state.eta, i)
+            state.get_signals(out=sim_data[:, i, :])
+
+            # The last sample of the trajectory is the state after the held samples
+            samples = min(horizon, controller.N - 1 - i) + 1
+            etas, nus, u_actuals = state.get_hold_trajectory(samples, sample_time)
+            held = controller.get_hold_steps(etas[:-1], i + 1, state.u_control) if samples > 1 else 0
+
+            block = slice(i + 1, i + 1 + held)
+            sim_data[:, block, :DOF] = etas[:held].transpose(1, 0, 2)
+            sim_data[:, block, DOF:2 * DOF] = nus[:held].transpose(1, 0, 2)
+            sim_data[:, block, 2 * DOF:2 * DOF + dimU] = state.u_control[:, None]
+            sim_data[:, block, 2 * DOF + dimU:] = u_actuals[:held].transpose(1, 0, 2)
+            state.eta[:] = etas[held]
+            state.nu[:] = nus[held]
+            state.u_actual[:] = u_actuals[held]
+
+            i += held + 1
+            progress.update(held + 1)
+            # Without look-ahead for one sample after an immediate switch, as the controls chatter
+            horizon = min(max(2 * horizon, 1), MAX_HORIZON) if held == samples - 1 else held
+
+    return sim_data
+
 
+def adaptive_simulate(controller: BaseController, state: SwarmState, sim_data, step_policy: ProximityStepPolicy):
+    """
+    Simulate with the controller updated at adaptive multiples of its sample time, chosen by
+    step_policy from the proximity of the vehicles to the target isoline, while the physics
+    is still propagated every sample. Every stepped state is stored in sim_data, the
+    controller records of the skipped samples are filled in afterwards by controller.resample().
+    """
+    sample_time = controller.sample_time
+    steps = []
+    i = 0
+    with tqdm(total=controller.N, desc=f"Vehicle Simulation x{controller.number_of_vehicles}") as progress:
+        while i < controller.N:
+            time_step = (i - steps[-1]) * sample_time if steps else sample_time
+            state.u_control[:] = controller.generate_control(state.eta, i, time_step=time_step)
+            state.get_signals(out=sim_data[:, i, :])
+
+            intensity, derivative, switched = controller.get_proximity(i, steps[-1] if steps else None)
+            steps.append(i)
+            samples = min(step_policy.get_samples(intensity, derivative, switched, sample_time),
+                          controller.N - 1 - i) or 1
+
+            # The physics keeps its own step, only the controller skips samples
+            for k in range(1, samples + 1):
+                state.step(sample_time)
+                # The state after the last step is stored with the next control update
+                if k < samples:
+                    state.get_signals(out=sim_data[:, i + k, :])
+            i += samples
+            progress.update(samples)
+
+    controller.resample(steps)
     return sim_data
@@ -0,0 +1,105 @@
+import copy
+import numpy as np
+
+DOF = 6  # degrees of freedom
+
+
+class SwarmState:
+    """
+    State of all vehicles of a swarm stored as arrays, row k belonging to the
+    vehicle with serial number k:
+        eta       (V, 6)     position/attitude
+        nu        (V, 6)     velocity
+        u_control (V, dimU)  commanded inputs
+        u_actual  (V, dimU)  actual inputs
+    Vehicles with fewer inputs than dimU use the leading columns of the input arrays.
+    """
+    def __init__(self, vehicles):
+        self.number_of_vehicles = len(vehicles)
+        self.dimU = max(vehicle.dimU for vehicle in vehicles)
+        self.eta = np.zeros((self.number_of_vehicles, DOF), float)
+        self.nu = np.zeros((self.number_of_vehicles, DOF), float)
+        self.u_control = np.zeros((self.number_of_vehicles, self.dimU), float)
+        self.u_actual = np.zeros((self.number_of_vehicles, self.dimU), float)
+        for vehicle in vehicles:
+            k = vehicle.serial_number
+            # position/attitude, user editable
+            self.eta[k, :2] = vehicle.starting_point[1], vehicle.starting_point[0]
+            self.eta[k, vehicle.heading_index] = vehicle.starting_heading
+            # velocity and actual inputs, defined by vehicle class
+            self.nu[k] = vehicle.nu
+            self.u_actual[k, :vehicle.dimU] = vehicle.u_actual
+
+        # Vehicles of the same class and batch key are integrated in one call: (vehicle, rows)
+        groups = {}
+        for vehicle in vehicles:
+            groups.setdefault((type(vehicle), vehicle.get_batch_key()), []).append(vehicle)
+        self.groups = [(self.get_batch_vehicle(group), np.array([vehicle.serial_number for vehicle in group]))
+                       for group in groups.values()]
+
+    @staticmethod
+    def get_batch_vehicle(group):
+        """
+        Get the vehicle that integrates a group: its first vehicle, or a copy of it holding
+        arrays of the row_parameters that differ within the group.
+        """
+        vehicle = group[0]
+        values = {name: np.array([getattr(member, name) for member in group], float)
+                  for name in vehicle.row_parameters}
+        values = {name: value for name, value in values.items() if np.any(value != value[0])}
+        if values:
+            vehicle = copy.copy(vehicle)
+            for name, value in values.items():
+                setattr(vehicle, name, value)
+        return vehicle
+
+    def __len__(self):
+        return self.number_of_vehicles
+
+    def step(self, sample_time):
+        """
+        Propagate the attitude and dynamics of all vehicles by one sample, one call per group.
+        """
+        for vehicle, rows in self.groups:
+            dimU = vehicle.dimU
+            eta, nu, u_actual = vehicle.step_batch(self.eta[rows], self.nu[rows], self.u_actual[rows, :dimU],
+                                                   self.u_control[rows, :dimU], sample_time)
+            self.eta[rows] = eta
+            self.nu[rows] = nu
+            self.u_actual[rows, :dimU] = u_actual
+
+    def is_closed_form(self) -> bool:
+        return all(vehicle.closed_form for vehicle, _ in self.groups)
+
+    def get_hold_trajectory(self, samples, sample_time):
+        """
+        Propagate all vehicles in closed form over the next samples with u_control held,
+        without changing the state.
+
+        Returns:
+        tuple: (eta, nu, u_actual) after 1 to samples samples, of shape (samples, V, ...).
+        """
+        etas = np.empty((samples,) + self.eta.shape)
+        nus = np.empty((samples,) + self.nu.shape)
+        u_actuals = np.array(np.broadcast_to(self.u_actual, (samples,) + self.u_actual.shape))
+        for vehicle, rows in self.groups:
+            dimU = vehicle.dimU
+            etas[:, rows], nus[:, rows], u_actuals[:, rows, :dimU] = vehicle.get_hold_trajectory_batch(
+                self.eta[rows], self.nu[rows], self.u_actual[rows, :dimU], self.u_control[rows, :dimU],
+                sample_time, samples)
+        return etas, nus, u_actuals
+
+    def get_signals(self, out=None):
+        """
+        Get one row of simulation data per vehicle: eta, nu, u_control, u_actual.
+
+        Returns:
+        np.ndarray: Array of shape (V, 2 * DOF + 2 * dimU).
+        """
+        if out is None:
+            out = np.empty((self.number_of_vehicles, 2 * DOF + 2 * self.dimU), float)
+        out[:, :DOF] = self.eta
+        out[:, DOF:2 * DOF] = self.nu
+        out[:, 2 * DOF:2 * DOF + self.dimU] = self.u_control
+        out[:, 2 * DOF + self.dimU:] = self.u_actual
+        return out
@@ -8,6 +8,7 @@ import argparse
 import spaces as sp
 import vehicles as vs
 import controllers as cs
+import integrators as integ
 
 from lib import *
 from tools import *
@@ -35,6 +36,93 @@ from tools import *
 # "░░░░░░░███░░░▒██▒░▓██░░░▒██░░░██▓░░░░░░▓██░░░░░░░\n"
 # "░░░░░░░░▓█████▓░░░░███▓░░▓███░░██████▒░▓██░░░░░░░\n"
 # "░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░\n")
+def create_vehicles(arguments) -> list:
+    """
+    Create arguments.vehicles vehicles of every type of arguments.vehicle_types, numbered
+    in this order and integrated with the integrator of the configuration.
+    """
+    if arguments.vehicles == 1:
+        starting_points = [[0, 0]]
+    elif len(arguments.start_points) == arguments.vehicles:
+        starting_points = arguments.start_points
+    else:
+        starting_points = [next(point_generator(arguments.radius, arguments.vehicles)) for _ in range(arguments.vehicles)]
+    vehicles = []
+    ng = number_generator()
+    cg = color_generator()
+    for vehicle_name in arguments.vehicle_types:
+        for order_number in range(arguments.vehicles):
+            vehicles.append(vs.create_instance(vehicle_name,
+                                               V_current=arguments.V_current,
+                                               serial_number=next(ng),
+                                               shift=arguments.shift_vehicle,
+                                               color=next(cg),
+                                               starting_point=starting_points[order_number],
+                                               **{key: getattr(arguments, key)
+                                                  for key in vs.get_class(vehicle_name).config_arguments}))
+    for vehicle in vehicles:
+        vehicle.set_integrator(integ.create_instance(arguments.integrator,
+                                                     time_step=arguments.physics_time_step,
+                                                     tolerance=arguments.integrator_tolerance))
+    return vehicles
+
+
+def create_space(arguments, shared_arrays=None) -> sp.BaseSpace:
+    """
+    Create the space of the configuration, with its raster and contour points, attaching
+    the shared_arrays published for it by another process.
+    """
+    space_arguments = {key: getattr(arguments, key) for key in sp.get_class(arguments.peak_type).config_arguments}
+    space = sp.create_instance(arguments.peak_type,
+                               x_range=(-arguments.axis_abs_max, arguments.axis_abs_max),
+                               y_range=(-arguments.axis_abs_max, arguments.axis_abs_max),
+                               grid_size=arguments.grid_size,
+                               shift_xyz=arguments.shift_xyz,
+                               space_filename=arguments.peaks_filename,
+                               target_isoline=arguments.target_isoline,
+                               peak_tolerance=arguments.peak_tolerance,
+                               cache_dir=arguments.cache_dir,
+                               shared_arrays=shared_arrays,
+                               **space_arguments)
+    if arguments.raster_order:
+        space.set_raster(order=arguments.raster_order, refinement=arguments.raster_refinement)
+    space.set_contour_points()
+    return space
+
+
+def create_controller(arguments, vehicles, space, **controller_arguments) -> cs.BaseController:
+    """
+    Create the controller of the configuration for vehicles in space.
+    """
+    config_arguments = {key: getattr(arguments, key)
+                        for key in cs.get_class(arguments.controller_type).config_arguments}
+    return cs.create_instance(arguments.controller_type,
+                              vehicles=vehicles,
+                              sim_time=arguments.sim_time_sec,
+                              sample_time=arguments.sample_time,
+                              space=space,
+                              **config_arguments,
+                              **controller_arguments)
+
+
+def create_scheduler(arguments, controller) -> tuple:
+    """
+    Create the scheduler of the control, physics and logging rates and, with
+    adaptive_max_time_step, the policy of adaptive controller steps.
+
+    Returns:
+    tuple: (Scheduler, ProximityStepPolicy or None).
+    """
+    scheduler = Scheduler(controller.sample_time, controller.N,
+                          physics_time_step=arguments.physics_time_step,
+                          log_time_step=arguments.log_time_step)
+    step_policy = None
+    if arguments.adaptive_max_time_step:
+        step_policy = ProximityStepPolicy(controller.sample_time, arguments.adaptive_max_time_step,
+                                          safety=arguments.adaptive_safety)
+    return scheduler, step_policy
+
+
 ###############################################################################
 # Main simulation loop
 ###############################################################################
@@ -55,23 +143,7 @@ if __name__ == '__main__':
     ###############################################################################
     # Vehicle constructors
     ###############################################################################
-    if arguments.vehicles == 1:
-        starting_points = [[0, 0]]
-    elif len(arguments.start_points) == arguments.vehicles:
-        starting_points = arguments.start_points
-    else:
-        starting_points = [next(point_generator(arguments.radius, arguments.vehicles)) for _ in range(arguments.vehicles)]
-    vehicles = []
-    ng = number_generator()
-    cg = color_generator()
-    for vehicle_name in arguments.vehicle_types:
-        for order_number in range(arguments.vehicles):
-            vehicles.append(vs.create_instance(vehicle_name,
-                                               V_current=arguments.V_current,
-                                               serial_number=next(ng),
-                                               shift=arguments.shift_vehicle,
-                                               color=next(cg),
-                                               starting_point=starting_points[order_number]))
+    vehicles = create_vehicles(arguments)
     for vehicle in vehicles:
         print(vehicle)
 
@@ -79,14 +151,7 @@ if __name__ == '__main__':
         clean_data()
     if arguments.big_picture:
         print('BE CAREFUL THE BIG PICTURE MODE REQUIRES MORE MEMORY')
-    space = sp.create_instance(arguments.peak_type,
-                               x_range=(-arguments.axis_abs_max, arguments.axis_abs_max),
-                               y_range=(-arguments.axis_abs_max, arguments.axis_abs_max),
-                               grid_size=arguments.grid_size,
-                               shift_xyz=arguments.shift_xyz,
-                               space_filename=arguments.peaks_filename,
-                               target_isoline=arguments.target_isoline)
-    space.set_contour_points(tol=1)
+    space = create_space(arguments)
     print(space)
 
     for i in range(arguments.cycles):
@@ -95,18 +160,17 @@ if __name__ == '__main__':
         space.set_data_storage(data_storage)
         plotting_all(space)
 
-        controller = cs.create_instance(arguments.controller_type,
-                                        vehicles=vehicles,
-                                        sim_time=arguments.sim_time_sec,
-                                        sample_time=arguments.sample_time,
-                                        space=space,
-                                        FPS=arguments.FPS,
-                                        isolines=arguments.isolines)
+        controller = create_controller(arguments, vehicles, space)
         controller.set_data_storage(data_storage)
         print(controller)
         print(data_storage)
 
-        swarmData = simultaneous_simulate(controller=controller)
+        scheduler, step_policy = create_scheduler(arguments, controller)
+        print(scheduler)
+        if step_policy is not None:
+            print(step_policy)
+
+        swarmData = simultaneous_simulate(controller=controller, scheduler=scheduler, step_policy=step_policy)
         plotting_all(controller,
                      separating_plots=arguments.separating_plots,
                      not_animated=arguments.not_animated,
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+peaks-converter.py: Convert a peak set between the .json, .npy and .npz formats,
+    the format is given by the file extension:
+        python peaks-converter.py peaks_1_8.json peaks_1_8.npy
+"""
+import argparse
+from spaces.peaks import convert_peaks
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='peaks-converter',
+                                     description='Convert a peak set between .json, .npy and .npz')
+    parser.add_argument('source', help='peak file to read')
+    parser.add_argument('target', help='peak file to write')
+    args = parser.parse_args()
+    convert_peaks(args.source, args.target)
@@ -0,0 +1,178 @@
+import numpy as np
+from math import pi, sin, cos, ceil, floor
+from spaces import Gaussian3DSpace
+from .grids import bilinear_lookup
+
+
+def shift_axis(C, cells, axis):
+    """
+    Shift the field content by a fractional number of cells towards increasing indices
+    along axis, with linear interpolation and zero inflow at the boundary.
+    """
+    whole = floor(cells)
+    fraction = cells - whole
+    return (1 - fraction) * shift_cells(C, whole, axis) + fraction * shift_cells(C, whole + 1, axis)
+
+
+def shift_cells(C, cells, axis):
+    """
+    Shift the field content by a whole number of cells along axis, filling with zeros.
+    """
+    shifted = np.zeros_like(C)
+    size = C.shape[axis]
+    if abs(cells) >= size:
+        return shifted
+    source = [slice(None)] * C.ndim
+    target = [slice(None)] * C.ndim
+    if cells >= 0:
+        source[axis], target[axis] = slice(0, size - cells), slice(cells, size)
+    else:
+        source[axis], target[axis] = slice(-cells, size), slice(0, size + cells)
+    shifted[tuple(target)] = C[tuple(source)]
+    return shifted
+
+
+class AdvectionDiffusionSpace(Gaussian3DSpace):
+    name = 'advection_diffusion'
+    time_varying = True
+    config_arguments = ('V_current', 'beta_current', 'diffusivity', 'solver_time_step', 'diffusion_method')
+    def __init__(self, x_range=(-50, 50), y_range=(-50, 50), grid_size=500, shift_xyz=None, space_filename="", target_isoline=0,
+                 peak_tolerance=0, cache_path="", shared_arrays=None, V_current=0, beta_current=0, diffusivity=0,
+                 solver_time_step=0.5, diffusion_method='stencil'):
+        """
+        Initialize the oil concentration raster from the peaks and evolve it under
+        advection by a uniform current and diffusion:
+            dC/dt + V_current . grad(C) = diffusivity * laplacian(C)
+
+        The solver advances in steps of solver_time_step, independently of the vehicle
+        sample time, and vehicles sample the raster with bilinear interpolation.
+
+        Parameters:
+        x_range (tuple): Range of x-axis values.
+        y_range (tuple): Range of y-axis values.
+        grid_size (int): Number of points in each dimension.
+        shift_xyz (int): Shift of all points of space by values from this array, respectively XYZ.
+        peak_tolerance (float): Contributions of a peak below this value are skipped, 0 evaluates every peak everywhere.
+        cache_path (str): Folder where generated arrays are stored and memory-mapped from, no caching if empty.
+        shared_arrays (SharedArrays): Arrays published by another process, attached instead of generated.
+        V_current (float): Current speed (m/s).
+        beta_current (float): Current direction (deg), measured from North towards East.
+        diffusivity (float): Horizontal diffusion coefficient (m^2/s).
+        solver_time_step (float): Time step of the field solver (s).
+        diffusion_method (str): 'stencil' for semi-Lagrangian advection and explicit diffusion
+                                with zero inflow boundaries, 'fft' for an exact spectral step
+                                on a periodic domain.
+        """
+        if diffusion_method not in ('stencil', 'fft'):
+            raise ValueError(f"Unknown diffusion method: {diffusion_method}")
+        self.V_c = V_current
+        self.beta_c = beta_current * pi / 180
+        self.diffusivity = diffusivity
+        self.solver_time_step = solver_time_step
+        self.diffusion_method = diffusion_method
+        self.time = 0
+        self.solver_step = 0
+        self.contour_step = 0
+        self.derivatives = None  # finite-difference rasters of Z and the solver step they belong to
+        super().__init__(x_range, y_range, grid_size, shift_xyz, space_filename, target_isoline, peak_tolerance,
+                         cache_path, shared_arrays)
+        self.initial_Z = self.Z
+        self.dx = self.x[1] - self.x[0]
+        self.dy = self.y[1] - self.y[0]
+        u_c = self.V_c * sin(self.beta_c)  # East, along x
+        v_c = self.V_c * cos(self.beta_c)  # North, along y
+        if diffusion_method == 'fft':
+            kx = 2 * pi * np.fft.rfftfreq(len(self.x), self.dx)
+            ky = 2 * pi * np.fft.fftfreq(len(self.y), self.dy)[:, None]
+            self.spectral_step = np.exp((-self.diffusivity * (kx ** 2 + ky ** 2) - 1j * (kx * u_c + ky * v_c))
+                                        * solver_time_step)
+        else:
+            self.advection_cells = (u_c * solver_time_step / self.dx, v_c * solver_time_step / self.dy)
+            # Explicit diffusion is stable for dt <= 1 / (2 K (1/dx^2 + 1/dy^2))
+            limit = 1 / (2 * self.diffusivity * (1 / self.dx ** 2 + 1 / self.dy ** 2)) if self.diffusivity else np.inf
+            self.diffusion_substeps = max(1, ceil(solver_time_step / limit))
+        self.type = "advection-diffusion"
+
+    def __str__(self):
+        return (super().__str__() +
+                f'\nCurrent: {self.V_c} m/s, {round(self.beta_c * 180 / pi, 2)} deg\n'
+                f'Diffusivity: {self.diffusivity} m^2/s\n'
+                f'Solver: {self.diffusion_method}, time step {self.solver_time_step} s')
+
+    def step(self):
+        """
+        Advance the concentration raster by one solver time step.
+        """
+        if self.diffusion_method == 'fft':
+            self.Z = np.fft.irfft2(np.fft.rfft2(self.Z) * self.spectral_step, s=self.Z.shape)
+        else:
+            C = shift_axis(shift_axis(self.Z, self.advection_cells[0], axis=1), self.advection_cells[1], axis=0)
+            dt = self.solver_time_step / self.diffusion_substeps
+            for _ in range(self.diffusion_substeps):
+                padded = np.pad(C, 1)
+                laplacian = ((padded[1:-1, 2:] - 2 * C + padded[1:-1, :-2]) / self.dx ** 2 +
+                             (padded[2:, 1:-1] - 2 * C + padded[:-2, 1:-1]) / self.dy ** 2)
+                C = C + self.diffusivity * dt * laplacian
+            self.Z = C
+        self.solver_step += 1
+
+    def set_time(self, t):
+        """
+        Advance the solver to the last solver step not later than t, restarting from the
+        initial raster if t lies before the current solver time.
+        """
+        self.time = t
+        target_step = floor(t / self.solver_time_step + 1e-9)
+        if target_step < self.solver_step:
+            self.Z = self.initial_Z
+            self.solver_step = 0
+        while self.solver_step < target_step:
+            self.step()
+
+    def set_raster(self, order=1, refinement=1):
+        raise ValueError("The advection-diffusion space is already a raster, raster_order must be 0")
+
+    def get_cached_arrays(self, names, build):
+        # Only the initial raster is a function of the cache key
+        if self.solver_step:
+            return build()
+        return super().get_cached_arrays(names, build)
+
+    def get_intensity_batch(self, xs, ys, t=None):
+        if t is not None:
+            self.set_time(t)
+        return bilinear_lookup(self.x, self.y, self.Z, xs, ys) - self.target_isoline
+
+    def get_derivative_rasters(self):
+        """
+        Get the finite-difference derivatives of the concentration raster, computed once per solver step.
+
+        Returns:
+        tuple: (Z_x, Z_y, Z_xx, Z_xy, Z_yy), each of the shape of Z.
+        """
+        if self.derivatives is None or self.derivatives[0] != self.solver_step:
+            Z_y, Z_x = np.gradient(self.Z, self.y, self.x)
+            Z_xy, Z_xx = np.gradient(Z_x, self.y, self.x)
+            Z_yy, Z_yx = np.gradient(Z_y, self.y, self.x)
+            self.derivatives = (self.solver_step, (Z_x, Z_y, Z_xx, 0.5 * (Z_xy + Z_yx), Z_yy))
+        return self.derivatives[1]
+
+    def get_intensity_derivatives(self, xs, ys):
+        """
+        Get the intensity, gradient and Hessian of the raster, the derivatives by central
+        differences sampled with the same bilinear lookup as the intensity.
+        """
+        Z_x, Z_y, Z_xx, Z_xy, Z_yy = (bilinear_lookup(self.x, self.y, raster, xs, ys)
+                                      for raster in self.get_derivative_rasters())
+        hessian = np.stack((np.stack((Z_xx, Z_xy), axis=-1), np.stack((Z_xy, Z_yy), axis=-1)), axis=-2)
+        return self.get_intensity_batch(xs, ys), np.stack((Z_x, Z_y), axis=-1), hessian
+
+    def get_gradient(self, xs, ys):
+        Z_x, Z_y = self.get_derivative_rasters()[:2]
+        return np.stack((bilinear_lookup(self.x, self.y, Z_x, xs, ys),
+                         bilinear_lookup(self.x, self.y, Z_y, xs, ys)), axis=-1)
+
+    def update_contours(self, max_age=0):
+        if self.contour_level is not None and self.contour_step != self.solver_step:
+            self.contour_step = self.solver_step
+            self.set_contour_points(self.contour_level)
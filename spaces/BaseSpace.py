@@ -2,6 +2,11 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 from abc import ABC
+from scipy.spatial import cKDTree
+from scipy.interpolate import RectBivariateSpline
+from .isolines import extract_isolines
+from .PeakIndex import PeakIndex
+from .peaks import PEAK_COLUMNS, load_peak_columns
 from tools.dataStorage import *
 from collections.abc import Sequence
 
@@ -55,9 +60,14 @@ class ShiftingSpace:
 
 class BaseSpace(ABC):
     name = 'base_space'
+    time_varying = False
+    # Seconds the isolines of a time-varying field may lag behind in the distance to the isoline
+    contour_interval = 0
+    # Extra constructor arguments taken from the run configuration
+    config_arguments = ()
 
     def __init__(self, x_range=(-30, 30), y_range=(-30, 30), grid_size=500, shift_xyz=None, space_filename="",
-                 target_isoline=0):
+                 target_isoline=0, peak_tolerance=0, cache_path="", shared_arrays=None):
         """
         Initialize the 3D space.
 
@@ -66,19 +76,32 @@ class BaseSpace(ABC):
         y_range (tuple): Range of y-axis values.
         grid_size (int): Number of points in each dimension.
         shift_xyz (int): Shift of all points of space by values from this array, respectively XYZ.
+        peak_tolerance (float): Contributions of a peak below this value are skipped, 0 evaluates every peak everywhere.
+        cache_path (str): Folder where generated arrays are stored and memory-mapped from, no caching if empty.
+        shared_arrays (SharedArrays): Arrays published by another process, attached instead of generated.
         """
         self.x = np.linspace(*x_range, int(grid_size))
         self.y = np.linspace(*y_range, grid_size)
-        self.X, self.Y = np.meshgrid(self.x, self.y)
-        self.Z = np.zeros_like(self.X)  # Start with a flat surface
+        # Read-only broadcast views instead of dense meshgrids
+        self.X = np.broadcast_to(self.x, (len(self.y), len(self.x)))
+        self.Y = np.broadcast_to(self.y[:, None], (len(self.y), len(self.x)))
+        self.Z = np.broadcast_to(0.0, self.X.shape)  # Start with a flat surface
         self.shift_xyz = ShiftingSpace(shift_xyz)
         self.interp = None
-        self.contour_points = list()
-        self.peaks = list()
-        if space_filename:
-            with open(space_filename, 'r') as file:
-                data = json.load(file)
-                self.peaks = [Peak(**item) for item in data]
+        self.raster_error = None
+        self.raster_bounds = None
+        self.contour_level = None
+        self.contour_points = np.empty((0, 2), float)
+        self.contour_offsets = np.zeros(1, dtype=np.intp)
+        self.contour_neighbours = np.empty((0, 2), dtype=np.intp)
+        self.contour_tree = cKDTree(self.contour_points)
+        self.peak_tolerance = peak_tolerance
+        self.cache_path = cache_path
+        self.shared_arrays = shared_arrays
+        self.peak_index = None
+        # One array per peak parameter, memory-mapped for .npy peak files
+        self.peak_columns = load_peak_columns(space_filename)
+        self.set_peak_arrays()
         self.type = ""
         self.target_isoline = target_isoline
         self.grid_size = grid_size
@@ -88,29 +111,394 @@ class BaseSpace(ABC):
         return (f'---space--------------------------------------------------------------------\n'
                 f'Space type: {self.type}\n'
                 f'Shifting space: {self.shift_xyz}\n'
-                f'Target isoline: {self.target_isoline}')
+                f'Target isoline: {self.target_isoline}'
+                + (f'\nRaster max interpolation error: {self.raster_error}' if self.interp is not None else ''))
 
-    def set_contour_points(self, plane_z=0, tol=1e-8):
-        cont = []
-        for i in range(len(self.X)):
-            for j in range(len(self.X[i])):
-                if abs(self.Z[i, j] - plane_z) < tol:
-                    cont.append((self.X[i, j], self.Y[i, j]))
-        self.contour_points = cont
+    def set_contour_points(self, plane_z=None):
+        """
+        Extract the isolines of Z at plane_z (the target isoline by default) with marching squares
+        and build the KD-tree used for nearest contour point queries.
+
+        The polyline vertices are stored as one (M, 2) array in contour_points, polyline k being
+        contour_points[contour_offsets[k]:contour_offsets[k + 1]].
+        """
+        if plane_z is None:
+            plane_z = self.target_isoline
+        self.contour_level = plane_z
+        self.contour_points, self.contour_offsets = self.get_cached_arrays(
+            (f'contour_points_{plane_z}', f'contour_offsets_{plane_z}'),
+            lambda: self.get_contour_arrays(plane_z))
+        # Previous and next vertex of each vertex along its polyline, itself at the polyline ends
+        index = np.arange(len(self.contour_points))
+        previous = index - 1
+        following = index + 1
+        previous[self.contour_offsets[:-1]] = self.contour_offsets[:-1]
+        following[self.contour_offsets[1:] - 1] = self.contour_offsets[1:] - 1
+        self.contour_neighbours = np.column_stack((previous, following))
+        self.contour_tree = cKDTree(self.contour_points)
+
+    def get_contour_arrays(self, level):
+        """
+        Extract the isolines of Z at level.
+
+        Returns:
+        tuple: (points, offsets), see extract_isolines().
+        """
+        return extract_isolines(self.x, self.y, self.Z, level)
 
-    def get_nearest_contour_point_norm(self, x, y):
-        return min([(xc - x) ** 2 + (yc - y) ** 2 for xc, yc in self.contour_points]) ** 0.5
+    def get_cached_arrays(self, names, build):
+        """
+        Attach the named arrays from shared_arrays, load them from cache_path, memory-mapped
+        read-only, or build them and store them there when they are missing.
+
+        Parameters:
+        names (tuple): File names of the arrays, without extension.
+        build (callable): Returns a tuple with one array per name.
+
+        Returns:
+        tuple: One array per name.
+        """
+        if self.shared_arrays is not None and all(name in self.shared_arrays for name in names):
+            return tuple(self.shared_arrays[name] for name in names)
+        if not self.cache_path:
+            return build()
+        paths = [os.path.join(self.cache_path, f'{name}.npy') for name in names]
+        if all(os.path.exists(path) for path in paths):
+            return tuple(np.load(path, mmap_mode='r') for path in paths)
+        arrays = build()
+        os.makedirs(self.cache_path, exist_ok=True)
+        for path, array in zip(paths, arrays):
+            # Write aside and rename, so concurrent runs never map a partially written file
+            temporary_path = f'{path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'wb') as file:
+                np.save(file, array)
+            os.replace(temporary_path, path)
+        return arrays
+
+    def get_shared_arrays(self) -> dict:
+        """
+        Get the generated arrays that other processes can attach instead of generating them,
+        by the names get_cached_arrays() requests them with.
+        """
+        arrays = {'Z': self.Z}
+        if self.contour_level is not None:
+            arrays[f'contour_points_{self.contour_level}'] = self.contour_points
+            arrays[f'contour_offsets_{self.contour_level}'] = self.contour_offsets
+        return arrays
 
-    def get_intensity(self, x_current, y_current):
+    def update_contours(self, max_age=0):
+        """
+        Extract the isolines again if a time-varying field moved since they were extracted,
+        static spaces keep theirs.
+
+        Parameters:
+        max_age (float): Seconds of field time the isolines may lag behind before they are extracted again.
+        """
         pass
 
+    def get_isolines(self) -> list:
+        self.update_contours()
+        return [self.contour_points[start:stop]
+                for start, stop in zip(self.contour_offsets[:-1], self.contour_offsets[1:])]
+
+    def get_nearest_contour_point_norm(self, x, y, t=None):
+        return float(self.get_nearest_contour_point_norm_batch(x, y, t))
+
+    def get_nearest_contour_point_norm_batch(self, xs, ys, t=None):
+        """
+        Get the distance from many points to the nearest isoline at once.
+        The nearest vertex is found with the KD-tree and the distance is refined
+        over the two polyline segments adjacent to it. The isolines of a time-varying
+        field are extracted again once they lag more than contour_interval seconds behind.
+
+        Parameters:
+        xs, ys (array_like): Coordinates of the query points, any matching shape.
+        t (float): Simulation time for time-varying spaces, the current time if None.
+
+        Returns:
+        np.ndarray: Distances with the shape of xs, inf if there are no contour points.
+        """
+        if t is not None:
+            self.set_time(t)
+        self.update_contours(self.contour_interval)
+        xs, ys = np.broadcast_arrays(np.asarray(xs, float), np.asarray(ys, float))
+        points = np.stack((xs, ys), axis=-1)
+        distances, nearest = self.contour_tree.query(points)
+        if not len(self.contour_points):
+            return distances
+        start = self.contour_points[nearest][..., None, :]
+        direction = self.contour_points[self.contour_neighbours[nearest]] - start
+        offset = points[..., None, :] - start
+        length2 = np.einsum('...ij,...ij->...i', direction, direction)
+        t = np.clip(np.einsum('...ij,...ij->...i', offset, direction) / np.where(length2 > 0, length2, 1), 0, 1)
+        residual = offset - t[..., None] * direction
+        return np.sqrt(np.einsum('...ij,...ij->...i', residual, residual).min(axis=-1))
+
+    def set_peak_arrays(self):
+        """
+        Pack the peak parameters into arrays, one entry per peak, so that
+        every query point can be evaluated against every peak in one broadcast.
+        """
+        self.peak_x0 = np.asarray(self.peak_columns['x0'], float)
+        self.peak_y0 = np.asarray(self.peak_columns['y0'], float)
+        self.peak_amplitude = np.asarray(self.peak_columns['amplitude'], float)
+        self.peak_inv_2sx2 = 1 / (2 * np.asarray(self.peak_columns['sigma_x'], float) ** 2)
+        self.peak_inv_2sy2 = 1 / (2 * np.asarray(self.peak_columns['sigma_y'], float) ** 2)
+        self.set_peak_index()
+
+    def set_peak_index(self):
+        """
+        Index the peaks by the bounding boxes outside of which their contribution
+        stays below peak_tolerance, no index if the tolerance is zero.
+        """
+        if self.peak_tolerance > 0:
+            # Beyond the cutoff exponent u the peak is negligible: the box bounds the ellipse u = cutoff
+            cutoff = np.maximum(self.get_peak_cutoff_exponent(self.peak_tolerance), 0)
+            half_x = np.sqrt(cutoff / self.peak_inv_2sx2)
+            half_y = np.sqrt(cutoff / self.peak_inv_2sy2)
+            x0 = self.peak_x0 + self.shift_xyz.shift_x()
+            y0 = self.peak_y0 + self.shift_xyz.shift_y()
+            self.peak_index = PeakIndex(x0 - half_x, x0 + half_x, y0 - half_y, y0 + half_y)
+        else:
+            self.peak_index = None
+
+    def get_peak_cutoff_exponent(self, tolerance):
+        """
+        Get, for every peak, the exponent beyond which its contribution stays below tolerance.
+
+        Returns:
+        np.ndarray: Array of shape (P,).
+        """
+        pass
+
+    def get_peak_profile(self, exponent, amplitude):
+        """
+        Get the contribution of a peak from its normalized squared distance.
+
+        Parameters:
+        exponent (np.ndarray): Normalized squared distance to the peak center.
+        amplitude (np.ndarray): Peak amplitude, broadcastable against exponent.
+
+        Returns:
+        np.ndarray: Contributions with the broadcast shape.
+        """
+        pass
+
+    def get_peak_axis_factors(self, ux, uy):
+        """
+        Split every peak over the grid into a sum of R outer products of 1-D factors,
+        peak p contributing sum_r fy[p, r][:, None] * fx[p, r][None, :].
+
+        Parameters:
+        ux, uy (np.ndarray): Per-axis exponents, see get_peak_axis_exponents().
+
+        Returns:
+        tuple: (fy, fx) of shapes (P, R, len(y)) and (P, R, len(x)).
+        """
+        pass
+
+    def get_peak_profile_derivatives(self, exponent, amplitude):
+        """
+        Get the contribution of a peak and its first and second derivatives with respect
+        to the normalized squared distance, sharing one exponential evaluation.
+
+        Returns:
+        tuple: (profile, d_profile, dd_profile) with the broadcast shape.
+        """
+        pass
+
+    def get_peak_terms(self, xs, ys):
+        """
+        Get the offsets from the query points to the peaks they are evaluated against.
+        Without a peak index every point is paired with every peak by broadcasting,
+        otherwise only the (point, peak) pairs inside the peak boxes are kept.
+
+        Parameters:
+        xs, ys (array_like): Coordinates of the query points, any matching shape.
+
+        Returns:
+        tuple: (dx, dy, inv_2sx2, inv_2sy2, amplitude, reduce), where reduce sums
+               per-pair values back into an array with the shape of xs.
+        """
+        if self.peak_index is None:
+            dx = np.asarray(xs, float)[..., None] - self.peak_x0 - self.shift_xyz.shift_x()
+            dy = np.asarray(ys, float)[..., None] - self.peak_y0 - self.shift_xyz.shift_y()
+            return (dx, dy, self.peak_inv_2sx2, self.peak_inv_2sy2, self.peak_amplitude,
+                    lambda values: values.sum(axis=-1))
+        xs, ys = np.broadcast_arrays(np.asarray(xs, float), np.asarray(ys, float))
+        x_flat, y_flat = xs.ravel(), ys.ravel()
+        point, peak = self.peak_index.query(x_flat, y_flat)
+        dx = x_flat[point] - self.peak_x0[peak] - self.shift_xyz.shift_x()
+        dy = y_flat[point] - self.peak_y0[peak] - self.shift_xyz.shift_y()
+        return (dx, dy, self.peak_inv_2sx2[peak], self.peak_inv_2sy2[peak], self.peak_amplitude[peak],
+                lambda values: np.bincount(point, weights=values, minlength=len(x_flat)).reshape(xs.shape))
+
+    def get_peak_axis_exponents(self, x, y):
+        """
+        Get the per-axis normalized squared distances from the grid lines to every peak.
+        The exponent of a peak over the grid is ux[:, None, :] + uy[:, :, None], so
+        separable peak shapes can be synthesized from 1-D factors with outer products.
+
+        Parameters:
+        x, y (np.ndarray): Grid axes.
+
+        Returns:
+        tuple: (ux, uy) of shapes (P, len(x)) and (P, len(y)).
+        """
+        ux = (x - (self.peak_x0 + self.shift_xyz.shift_x())[:, None]) ** 2 * self.peak_inv_2sx2[:, None]
+        uy = (y - (self.peak_y0 + self.shift_xyz.shift_y())[:, None]) ** 2 * self.peak_inv_2sy2[:, None]
+        return ux, uy
+
+    def get_grid_intensity(self, x, y):
+        """
+        Get the analytic Z values over the grid spanned by the ascending x and y axes.
+        With a peak index every peak only touches the grid window inside its box.
+
+        Returns:
+        np.ndarray: Array of shape (len(y), len(x)).
+        """
+        x = np.asarray(x, float)
+        y = np.asarray(y, float)
+        fy, fx = self.get_peak_axis_factors(*self.get_peak_axis_exponents(x, y))
+        if self.peak_index is None:
+            return fy.reshape(-1, len(y)).T @ fx.reshape(-1, len(x))
+        Z = np.zeros((len(y), len(x)))
+        col_start = np.searchsorted(x, self.peak_index.x_min, side='left')
+        col_stop = np.searchsorted(x, self.peak_index.x_max, side='right')
+        row_start = np.searchsorted(y, self.peak_index.y_min, side='left')
+        row_stop = np.searchsorted(y, self.peak_index.y_max, side='right')
+        for p in np.nonzero((col_stop > col_start) & (row_stop > row_start))[0]:
+            rows = slice(row_start[p], row_stop[p])
+            cols = slice(col_start[p], col_stop[p])
+            Z[rows, cols] += fy[p, :, rows].T @ fx[p, :, cols]
+        return Z
+
+    def set_raster(self, order=1, refinement=1):
+        """
+        Sample the analytic field once onto a raster and answer get_intensity by
+        interpolation, bilinear (order=1) or bicubic (order=3). Points outside
+        the raster fall back to the analytic field.
+
+        Parameters:
+        order (int): Spline degree of the interpolation, 1 or 3.
+        refinement (int): Number of raster cells per grid cell along each axis.
+
+        Returns:
+        float: Maximum interpolation error against the analytic field, measured at the raster cell centers.
+        """
+        x = np.linspace(self.x[0], self.x[-1], (len(self.x) - 1) * refinement + 1)
+        y = np.linspace(self.y[0], self.y[-1], (len(self.y) - 1) * refinement + 1)
+        self.raster_bounds = (x[0], x[-1], y[0], y[-1])
+        self.interp = RectBivariateSpline(x, y, (self.get_grid_intensity(x, y) - self.target_isoline).T,
+                                          kx=order, ky=order)
+        x_centers = 0.5 * (x[1:] + x[:-1])
+        y_centers = 0.5 * (y[1:] + y[:-1])
+        analytic = self.get_grid_intensity(x_centers, y_centers) - self.target_isoline
+        self.raster_error = float(np.abs(self.interp(x_centers, y_centers).T - analytic).max())
+        return self.raster_error
+
+    def set_time(self, t):
+        """
+        Move a time-varying field to time t, static spaces ignore it.
+        """
+        pass
+
+    def get_intensity(self, x_current, y_current, t=None):
+        return float(self.get_intensity_batch(x_current, y_current, t))
+
+    def get_intensity_batch(self, xs, ys, t=None):
+        """
+        Get the intensity relative to the target isoline for many points at once,
+        from the raster if one is set and from the analytic field otherwise.
+
+        Parameters:
+        xs, ys (array_like): Coordinates of the query points, any matching shape.
+        t (float): Simulation time for time-varying spaces, the current time if None.
+
+        Returns:
+        np.ndarray: Intensity values with the shape of xs.
+        """
+        if t is not None:
+            self.set_time(t)
+        if self.interp is None:
+            return self.get_analytic_intensity_batch(xs, ys)
+        xs, ys = np.broadcast_arrays(np.asarray(xs, float), np.asarray(ys, float))
+        x_min, x_max, y_min, y_max = self.raster_bounds
+        inside = (xs >= x_min) & (xs <= x_max) & (ys >= y_min) & (ys <= y_max)
+        if inside.all():
+            return self.interp.ev(xs, ys)
+        intensity = np.empty(xs.shape)
+        intensity[inside] = self.interp.ev(xs[inside], ys[inside])
+        intensity[~inside] = self.get_analytic_intensity_batch(xs[~inside], ys[~inside])
+        return intensity
+
+    def get_analytic_intensity_batch(self, xs, ys):
+        """
+        Get the intensity relative to the target isoline for many points at once,
+        evaluated from the peaks. With a peak index only the (point, peak) pairs
+        inside the peak boxes are evaluated.
+
+        Parameters:
+        xs, ys (array_like): Coordinates of the query points, any matching shape.
+
+        Returns:
+        np.ndarray: Intensity values with the shape of xs.
+        """
+        dx, dy, inv_2sx2, inv_2sy2, amplitude, reduce = self.get_peak_terms(xs, ys)
+        return reduce(self.get_peak_profile(dx ** 2 * inv_2sx2 + dy ** 2 * inv_2sy2, amplitude)) - self.target_isoline
+
+    def get_intensity_derivatives(self, xs, ys):
+        """
+        Get the intensity relative to the target isoline, its gradient and its Hessian
+        for many points at once, in a single pass over the peaks of the analytic field.
+
+        With u = (x - x0)^2 / (2 sx^2) + (y - y0)^2 / (2 sy^2) and a peak profile g(u):
+        df/dx = g'(u) u_x,  d2f/dx2 = g''(u) u_x^2 + g'(u) / sx^2,  d2f/dxdy = g''(u) u_x u_y.
+
+        Parameters:
+        xs, ys (array_like): Coordinates of the query points, any matching shape.
+
+        Returns:
+        tuple: (intensity, gradient, hessian) of shapes xs.shape, xs.shape + (2,) and xs.shape + (2, 2).
+        """
+        dx, dy, inv_2sx2, inv_2sy2, amplitude, reduce = self.get_peak_terms(xs, ys)
+        g, d_g, dd_g = self.get_peak_profile_derivatives(dx ** 2 * inv_2sx2 + dy ** 2 * inv_2sy2, amplitude)
+        u_x = 2 * inv_2sx2 * dx
+        u_y = 2 * inv_2sy2 * dy
+        intensity = reduce(g) - self.target_isoline
+        gradient = np.stack((reduce(d_g * u_x), reduce(d_g * u_y)), axis=-1)
+        f_xy = reduce(dd_g * u_x * u_y)
+        hessian = np.stack((np.stack((reduce(dd_g * u_x ** 2 + 2 * inv_2sx2 * d_g), f_xy), axis=-1),
+                            np.stack((f_xy, reduce(dd_g * u_y ** 2 + 2 * inv_2sy2 * d_g)), axis=-1)), axis=-2)
+        return intensity, gradient, hessian
+
+    def get_gradient(self, xs, ys):
+        """
+        Get the gradient of the analytic field at many points at once.
+
+        Returns:
+        np.ndarray: Array of shape xs.shape + (2,) holding (df/dx, df/dy).
+        """
+        dx, dy, inv_2sx2, inv_2sy2, amplitude, reduce = self.get_peak_terms(xs, ys)
+        _, d_g, _ = self.get_peak_profile_derivatives(dx ** 2 * inv_2sx2 + dy ** 2 * inv_2sy2, amplitude)
+        return np.stack((reduce(2 * inv_2sx2 * dx * d_g), reduce(2 * inv_2sy2 * dy * d_g)), axis=-1)
+
+    def get_hessian(self, xs, ys):
+        """
+        Get the Hessian of the analytic field at many points at once.
+
+        Returns:
+        np.ndarray: Array of shape xs.shape + (2, 2).
+        """
+        return self.get_intensity_derivatives(xs, ys)[2]
+
     def plotting_surface(self, store_plot=False, **arguments):
         """
         Plot the 3D surface with all peaks.
         """
         fig = plt.figure()
         ax = fig.add_subplot(111, projection='3d')
-        ax.plot_surface(self.X, self.Y, self.Z, cmap='viridis')
+        ax.plot_surface(self.get_X(), self.get_Y(), self.get_Z(), cmap='viridis')
         ax.set_xlabel('X,m / East')
         ax.set_ylabel('Y,m / North')
         ax.set_zlabel('Intensity')
@@ -121,6 +509,10 @@ class BaseSpace(ABC):
             plt.title(f"Intensity map, based on {self.name} peaks")
             plt.show()
 
+    @property
+    def peaks(self) -> list:
+        return [Peak(*row) for row in zip(*(self.peak_columns[name].tolist() for name in PEAK_COLUMNS))]
+
     def get_json_data(self):
         json_data = list()
         for peak in self.peaks:
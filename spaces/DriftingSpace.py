@@ -0,0 +1,107 @@
+import numpy as np
+from math import pi, sin, cos
+from spaces import Gaussian3DSpace
+
+
+class DriftingGaussian3DSpace(Gaussian3DSpace):
+    name = 'drifting'
+    time_varying = True
+    config_arguments = ('V_current', 'beta_current', 'diffusivity', 'contour_interval')
+    def __init__(self, x_range=(-50, 50), y_range=(-50, 50), grid_size=500, shift_xyz=None, space_filename="", target_isoline=0,
+                 peak_tolerance=0, cache_path="", shared_arrays=None, V_current=0, beta_current=0, diffusivity=0,
+                 contour_interval=1):
+        """
+        Initialize the drifting and spreading Gaussian spill space.
+
+        Every peak is a patch of oil carried by the current and spreading by diffusion,
+        so at time t its parameters are known in closed form:
+            center:    (x0, y0) + t * V_current * (sin(beta_current), cos(beta_current))  (East, North)
+            sigma^2:   sigma0^2 + 2 * diffusivity * t
+            amplitude: amplitude0 * sigma_x0 * sigma_y0 / (sigma_x * sigma_y)  (mass is conserved)
+
+        Parameters:
+        x_range (tuple): Range of x-axis values.
+        y_range (tuple): Range of y-axis values.
+        grid_size (int): Number of points in each dimension.
+        shift_xyz (int): Shift of all points of space by values from this array, respectively XYZ.
+        peak_tolerance (float): Contributions of a peak below this value are skipped, 0 evaluates every peak everywhere.
+        cache_path (str): Folder where generated arrays are stored and memory-mapped from, no caching if empty.
+        shared_arrays (SharedArrays): Arrays published by another process, attached instead of generated.
+        V_current (float): Current speed (m/s).
+        beta_current (float): Current direction (deg), measured from North towards East.
+        diffusivity (float): Horizontal diffusion coefficient (m^2/s).
+        contour_interval (float): Seconds the isoline of the distance to the isoline may lag behind the peaks,
+            0 extracts it again at every sample.
+        """
+        self.V_c = V_current
+        self.beta_c = beta_current * pi / 180
+        self.diffusivity = diffusivity
+        self.contour_interval = contour_interval
+        self.time = 0
+        self.frame_time = 0
+        super().__init__(x_range, y_range, grid_size, shift_xyz, space_filename, target_isoline, peak_tolerance,
+                         cache_path, shared_arrays)
+        self.type = "drifting"
+
+    def __str__(self):
+        return (super().__str__() +
+                f'\nCurrent: {self.V_c} m/s, {round(self.beta_c * 180 / pi, 2)} deg\n'
+                f'Diffusivity: {self.diffusivity} m^2/s\n'
+                f'Contour interval: {self.contour_interval} s')
+
+    def set_peak_arrays(self):
+        super().set_peak_arrays()
+        self.initial_peak_x0 = self.peak_x0
+        self.initial_peak_y0 = self.peak_y0
+        self.initial_peak_amplitude = self.peak_amplitude
+        self.initial_peak_sigma_x2 = 1 / (2 * self.peak_inv_2sx2)
+        self.initial_peak_sigma_y2 = 1 / (2 * self.peak_inv_2sy2)
+
+    def set_time(self, t):
+        """
+        Move the peaks to time t: O(P) closed-form updates of the packed peak arrays.
+        """
+        if t == self.time:
+            return
+        self.time = t
+        spread = 2 * self.diffusivity * t
+        sigma_x2 = self.initial_peak_sigma_x2 + spread
+        sigma_y2 = self.initial_peak_sigma_y2 + spread
+        self.peak_x0 = self.initial_peak_x0 + self.V_c * sin(self.beta_c) * t
+        self.peak_y0 = self.initial_peak_y0 + self.V_c * cos(self.beta_c) * t
+        self.peak_amplitude = self.initial_peak_amplitude * np.sqrt(
+            self.initial_peak_sigma_x2 * self.initial_peak_sigma_y2 / (sigma_x2 * sigma_y2))
+        self.peak_inv_2sx2 = 1 / (2 * sigma_x2)
+        self.peak_inv_2sy2 = 1 / (2 * sigma_y2)
+        self.set_peak_index()
+
+    def set_frame(self):
+        """
+        Regenerate Z and, if they were extracted, the isolines at the current time.
+        Only done on request of the plots and, every contour_interval seconds, of the distance
+        to the isoline, the vehicles sample the peaks directly.
+        """
+        if self.frame_time == self.time:
+            return
+        self.frame_time = self.time
+        self.Z = self.get_grid_intensity(self.x, self.y)
+        if self.contour_level is not None:
+            self.set_contour_points(self.contour_level)
+
+    def set_raster(self, order=1, refinement=1):
+        raise ValueError("A raster of a time-varying field would be stale after the first step, "
+                         "raster_order must be 0")
+
+    def get_cached_arrays(self, names, build):
+        # Only the initial frame is a function of the cache key
+        if self.time:
+            return build()
+        return super().get_cached_arrays(names, build)
+
+    def get_Z(self):
+        self.set_frame()
+        return self.Z
+
+    def update_contours(self, max_age=0):
+        if abs(self.time - self.frame_time) >= max_age:
+            self.set_frame()
@@ -4,7 +4,8 @@ from spaces import BaseSpace
 
 class Gaussian3DSpace(BaseSpace):
     name = 'gaussian'
-    def __init__(self, x_range=(-50, 50), y_range=(-50, 50), grid_size=500, shift_xyz=None, space_filename="", target_isoline=0):
+    def __init__(self, x_range=(-50, 50), y_range=(-50, 50), grid_size=500, shift_xyz=None, space_filename="", target_isoline=0,
+                 peak_tolerance=0, cache_path="", shared_arrays=None):
         """
         Initialize the 3D Gaussian space.
 
@@ -13,8 +14,12 @@ class Gaussian3DSpace(BaseSpace):
         y_range (tuple): Range of y-axis values.
         grid_size (int): Number of points in each dimension.
         shift_xyz (int): Shift of all points of space by values from this array, respectively XYZ.
+        peak_tolerance (float): Contributions of a peak below this value are skipped, 0 evaluates every peak everywhere.
+        cache_path (str): Folder where generated arrays are stored and memory-mapped from, no caching if empty.
+        shared_arrays (SharedArrays): Arrays published by another process, attached instead of generated.
         """
-        super().__init__(x_range, y_range, grid_size, shift_xyz, space_filename, target_isoline)
+        super().__init__(x_range, y_range, grid_size, shift_xyz, space_filename, target_isoline, peak_tolerance,
+                         cache_path, shared_arrays)
         """
             Add a Gaussian peak to the Z surface.
 
@@ -23,25 +28,28 @@ class Gaussian3DSpace(BaseSpace):
             amplitude (float): Height of the Gaussian peak.
             sigma_x, sigma_y (float): Spread of the Gaussian in x and y directions.
         """
-        for peak in self.peaks:
-            self.Z += peak.amplitude * np.exp(-((self.X - peak.x0 - self.shift_xyz.shift_x()) ** 2 / (2 * peak.sigma_x ** 2) +
-                                                (self.Y - peak.y0 - self.shift_xyz.shift_y()) ** 2 / (2 * peak.sigma_y ** 2)))
+        self.set_Z()
         # self.Z += self.shift_xyz.shift_z()
         self.type = "gaussian"
 
-    def get_intensity(self, x_current, y_current):
+    def set_Z(self):
         """
-        Get the Z value at a specific (x, y) point.
+        Generate Z over the whole grid, or load it from the cache.
+        """
+        self.Z, = self.get_cached_arrays(('Z',), lambda: (self.get_grid_intensity(self.x, self.y),))
 
-        Parameters:
-        x_current, y_current (float): The x and y coordinates for which to get the Z value.
+    def get_peak_cutoff_exponent(self, tolerance):
+        # |A| * exp(-u) < tolerance
+        with np.errstate(divide='ignore'):
+            return np.log(np.abs(self.peak_amplitude) / tolerance)
 
-        Returns:
-        float: The Z value at the specified (x, y) point.
-        """
-        intensity: float = 0
-        for peak in self.peaks:
-            intensity += peak.amplitude * np.exp(-((x_current - peak.x0 - self.shift_xyz.shift_x()) ** 2 / (2 * peak.sigma_x ** 2) +
-                                    (y_current - peak.y0 - self.shift_xyz.shift_y()) ** 2 / (2 * peak.sigma_y ** 2)))
-        intensity -= self.target_isoline
-        return intensity
+    def get_peak_profile(self, exponent, amplitude):
+        return amplitude * np.exp(-exponent)
+
+    def get_peak_profile_derivatives(self, exponent, amplitude):
+        g = amplitude * np.exp(-exponent)
+        return g, -g, g
+
+    def get_peak_axis_factors(self, ux, uy):
+        # Axis-aligned Gaussians are separable: A * exp(-ux - uy) = (A * exp(-uy)) (x) exp(-ux)
+        return (self.peak_amplitude[:, None] * np.exp(-uy))[:, None, :], np.exp(-ux)[:, None, :]
@@ -4,7 +4,8 @@ from spaces import BaseSpace
 
 class Parabolic3DSpace(BaseSpace):
     name = 'parabolic'
-    def __init__(self, x_range=(-50, 50), y_range=(-50, 50), grid_size=500, shift_xyz=None, space_filename="", target_isoline=0):
+    def __init__(self, x_range=(-50, 50), y_range=(-50, 50), grid_size=500, shift_xyz=None, space_filename="", target_isoline=0,
+                 peak_tolerance=0, cache_path="", shared_arrays=None):
         """
         Initialize the 3D Parabolic space.
 
@@ -13,8 +14,12 @@ class Parabolic3DSpace(BaseSpace):
         y_range (tuple): Range of y-axis values.
         grid_size (int): Number of points in each dimension.
         shift_xyz (int): Shift of all points of space by values from this array, respectively XYZ.
+        peak_tolerance (float): Contributions of a peak below this value are skipped, 0 evaluates every peak everywhere.
+        cache_path (str): Folder where generated arrays are stored and memory-mapped from, no caching if empty.
+        shared_arrays (SharedArrays): Arrays published by another process, attached instead of generated.
         """
-        super().__init__(x_range, y_range, grid_size, shift_xyz, space_filename, target_isoline)
+        super().__init__(x_range, y_range, grid_size, shift_xyz, space_filename, target_isoline, peak_tolerance,
+                         cache_path, shared_arrays)
         """
             Add a Parabolic peak to the Z surface.
 
@@ -23,35 +28,39 @@ class Parabolic3DSpace(BaseSpace):
             amplitude (float): Height of the Parabolic peak.
             sigma_x, sigma_y (float): Spread of the Parabolic in x and y directions.
         """
-        for peak in self.peaks:
-            self.Z += ((peak.amplitude -((self.X - peak.x0 - self.shift_xyz.shift_x()) ** 2 / (2 * peak.sigma_x ** 2) +
-                                        (self.Y - peak.y0 - self.shift_xyz.shift_y()) ** 2 / (2 * peak.sigma_y ** 2))) *
-                       np.exp(-((self.X - peak.x0 - self.shift_xyz.shift_x()) ** 2 / (2 * peak.sigma_x ** 2) +
-                                (self.Y - peak.y0 - self.shift_xyz.shift_y()) ** 2 / (2 * peak.sigma_y ** 2))))
-        # Corrects the error if the graph has a concave part below zero. All points below zero become zero.
-        for i in range(len(self.X)):
-            for j in range(len(self.X[i])):
-                if self.Z[i, j] < 0:
-                    self.Z[i, j] = 0
+        self.set_Z()
         #self.Z += self.shift_xyz.shift_z()
         self.type = "parabolic"
 
-    def get_intensity(self, x_current, y_current):
+    def get_clipped_grid_intensity(self, x, y):
+        Z = self.get_grid_intensity(x, y)
+        # Corrects the error if the graph has a concave part below zero. All points below zero become zero.
+        np.maximum(Z, 0, out=Z)
+        return Z
+
+    def set_Z(self):
+        """
+        Generate Z over the whole grid, or load it from the cache.
         """
-        Get the Z value at a specific (x, y) point.
+        self.Z, = self.get_cached_arrays(('Z',), lambda: (self.get_clipped_grid_intensity(self.x, self.y),))
 
-        Parameters:
-        x_current, y_current (float): The x and y coordinates for which to get the Z value.
+    def get_peak_cutoff_exponent(self, tolerance):
+        # |A - u| * exp(-u) <= (|A| + u) * exp(-u) < tolerance, solved from above by fixed-point iteration
+        amplitude = np.abs(self.peak_amplitude)
+        cutoff = np.maximum(2 * np.log((amplitude + 1) / tolerance) + 1, 1)
+        for _ in range(20):
+            cutoff = np.maximum(np.log((amplitude + cutoff) / tolerance), 0)
+        return cutoff
 
-        Returns:
-        float: The Z value at the specified (x, y) point.
-        """
-        intensity: float = 0
-        for peak in self.peaks:
-            intensity += ((peak.amplitude -((x_current - peak.x0 - self.shift_xyz.shift_x()) ** 2 / (2 * peak.sigma_x ** 2) +
-                                             (y_current - peak.y0 - self.shift_xyz.shift_y()) ** 2 / (2 * peak.sigma_y ** 2))) *
-                           np.exp(-((x_current - peak.x0 - self.shift_xyz.shift_x()) ** 2 / (2 * peak.sigma_x ** 2) +
-                                    (y_current - peak.y0 - self.shift_xyz.shift_y()) ** 2 / (2 * peak.sigma_y ** 2))))
-        #print(intensity)
-        intensity -= self.target_isoline
-        return intensity
+    def get_peak_profile(self, exponent, amplitude):
+        return (amplitude - exponent) * np.exp(-exponent)
+
+    def get_peak_profile_derivatives(self, exponent, amplitude):
+        e = np.exp(-exponent)
+        return (amplitude - exponent) * e, (exponent - amplitude - 1) * e, (amplitude + 2 - exponent) * e
+
+    def get_peak_axis_factors(self, ux, uy):
+        # (A - ux - uy) * exp(-ux) * exp(-uy) splits into three outer products
+        ex, ey = np.exp(-ux), np.exp(-uy)
+        return (np.stack((self.peak_amplitude[:, None] * ey, -ey, -uy * ey), axis=1),
+                np.stack((ex, ux * ex, ex), axis=1))
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class PeakIndex:
+    """
+    Uniform grid of buckets over the bounding boxes of the peaks.
+    Every bucket lists the peaks whose box overlaps it, so a point only
+    has to be evaluated against the peaks of the bucket it falls into.
+    """
+    def __init__(self, x_min, x_max, y_min, y_max, max_cells=1024):
+        """
+        Build the bucket grid.
+
+        Parameters:
+        x_min, x_max, y_min, y_max (np.ndarray): Bounding box of every peak, shape (P,).
+        max_cells (int): Upper limit on the number of buckets along each axis.
+        """
+        self.x_min, self.x_max = np.asarray(x_min, float), np.asarray(x_max, float)
+        self.y_min, self.y_max = np.asarray(y_min, float), np.asarray(y_max, float)
+        self.number_of_peaks = len(self.x_min)
+        if self.number_of_peaks:
+            self.origin = np.array([self.x_min.min(), self.y_min.min()])
+            extent = np.array([self.x_max.max(), self.y_max.max()]) - self.origin
+            # Buckets about the size of a typical box, but not more than max_cells per axis
+            box_size = np.median(np.maximum(self.x_max - self.x_min, self.y_max - self.y_min))
+            self.cell_size = max(box_size, extent.max() / max_cells, np.finfo(float).tiny)
+        else:
+            self.origin = np.zeros(2)
+            extent = np.zeros(2)
+            self.cell_size = 1.0
+        self.shape = (np.floor(extent / self.cell_size).astype(int) + 1)
+
+        # Range of buckets covered by every box
+        ix0, iy0 = self.get_cells(self.x_min, self.y_min)
+        ix1, iy1 = self.get_cells(self.x_max, self.y_max)
+        width, height = ix1 - ix0 + 1, iy1 - iy0 + 1
+        count = width * height
+
+        # Expand every peak into the (peak, bucket) pairs it covers
+        peak = np.repeat(np.arange(self.number_of_peaks), count)
+        local = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+        cell_x = ix0[peak] + local % width[peak]
+        cell_y = iy0[peak] + local // width[peak]
+        cell = cell_y * self.shape[0] + cell_x
+
+        order = np.argsort(cell, kind='stable')
+        self.cell_peaks = peak[order]
+        self.cell_offsets = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.intp)
+        np.cumsum(np.bincount(cell, minlength=self.shape[0] * self.shape[1]), out=self.cell_offsets[1:])
+
+    def __str__(self):
+        return (f'{self.number_of_peaks} peaks in {self.shape[0]}x{self.shape[1]} buckets '
+                f'of {self.cell_size:.3g} m')
+
+    def get_cells(self, xs, ys):
+        """
+        Get the bucket column and row of every point, clipped to the grid.
+        """
+        ix = np.clip(((np.asarray(xs, float) - self.origin[0]) // self.cell_size).astype(int), 0, self.shape[0] - 1)
+        iy = np.clip(((np.asarray(ys, float) - self.origin[1]) // self.cell_size).astype(int), 0, self.shape[1] - 1)
+        return ix, iy
+
+    def query(self, xs, ys):
+        """
+        Get every (point, peak) pair where the point lies in the box of the peak.
+
+        Parameters:
+        xs, ys (np.ndarray): Coordinates of the query points, shape (V,).
+
+        Returns:
+        tuple: (point_index, peak_index) arrays of the same length.
+        """
+        xs = np.asarray(xs, float)
+        ys = np.asarray(ys, float)
+        ix, iy = self.get_cells(xs, ys)
+        cell = iy * self.shape[0] + ix
+        start = self.cell_offsets[cell]
+        count = self.cell_offsets[cell + 1] - start
+        point = np.repeat(np.arange(len(xs)), count)
+        peak = self.cell_peaks[np.repeat(start - np.cumsum(count) + count, count) + np.arange(count.sum())]
+        inside = ((xs[point] >= self.x_min[peak]) & (xs[point] <= self.x_max[peak]) &
+                  (ys[point] >= self.y_min[peak]) & (ys[point] <= self.y_max[peak]))
+        return point[inside], peak[inside]
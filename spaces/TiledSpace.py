@@ -0,0 +1,214 @@
+import numpy as np
+from collections import OrderedDict
+from math import ceil
+from spaces import Gaussian3DSpace
+from .grids import bilinear_lookup
+from .isolines import extract_tiled_isolines
+
+
+class TiledGaussian3DSpace(Gaussian3DSpace):
+    name = 'tiled'
+    config_arguments = ('tile_size', 'tile_levels', 'tile_cache_mb', 'view_samples')
+    def __init__(self, x_range=(-50, 50), y_range=(-50, 50), grid_size=500, shift_xyz=None, space_filename="", target_isoline=0,
+                 peak_tolerance=0, cache_path="", shared_arrays=None, tile_size=256, tile_levels=4, tile_cache_mb=256,
+                 view_samples=500):
+        """
+        Initialize the 3D Gaussian space over a large area without materialising the whole grid.
+
+        Z is generated tile by tile on request, at grid_size resolution (level 0) or at
+        coarser levels halving the resolution each, and the generated tiles are kept in a
+        least recently used cache of bounded size. Plots show a view region at the
+        coarsest level with at least view_samples samples across it, and the contours and
+        the raster lookups only generate the full resolution tiles they touch.
+
+        Parameters:
+        x_range (tuple): Range of x-axis values.
+        y_range (tuple): Range of y-axis values.
+        grid_size (int): Number of points in each dimension at the finest level.
+        shift_xyz (int): Shift of all points of space by values from this array, respectively XYZ.
+        peak_tolerance (float): Contributions of a peak below this value are skipped, 0 evaluates every peak everywhere.
+        cache_path (str): Folder where generated arrays are stored and memory-mapped from, no caching if empty.
+        shared_arrays (SharedArrays): Arrays published by another process, attached instead of generated.
+        tile_size (int): Number of samples along each side of a tile, neighbouring tiles share their edge samples.
+        tile_levels (int): Number of resolution levels.
+        tile_cache_mb (float): Memory limit of the tile cache (MB).
+        view_samples (int): Minimal number of samples across the view region of the plots.
+        """
+        self.tile_size = tile_size
+        self.tile_levels = tile_levels
+        self.tile_cache_bytes = tile_cache_mb * 2 ** 20
+        self.view_samples = view_samples
+        self.tiles = OrderedDict()
+        self.tile_bytes = 0
+        self.raster_tiles = False
+        super().__init__(x_range, y_range, grid_size, shift_xyz, space_filename, target_isoline, peak_tolerance,
+                         cache_path, shared_arrays)
+        self.type = "tiled"
+
+    def __str__(self):
+        return (super().__str__() +
+                f'\nTiles: {self.tile_size}x{self.tile_size} samples, {self.tile_levels} levels, '
+                f'{len(self.tiles)} cached ({self.tile_bytes / 2 ** 20:.1f} of {self.tile_cache_bytes / 2 ** 20:.0f} MB)'
+                + ('\nRaster: bilinear over the level 0 tiles' if self.raster_tiles else ''))
+
+    def set_Z(self):
+        self.set_view((self.x[0], self.x[-1]), (self.y[0], self.y[-1]))
+
+    def set_view(self, x_range, y_range):
+        """
+        Select the region shown by the plots, get_X(), get_Y() and get_Z() return it
+        at the coarsest level with at least view_samples samples across it.
+        """
+        extent = max(x_range[1] - x_range[0], y_range[1] - y_range[0])
+        level = 0
+        while (level + 1 < self.tile_levels and
+               extent / (self.get_level_spacing(level + 1)) + 1 >= self.view_samples):
+            level += 1
+        x, y, self.Z = self.get_region(x_range, y_range, level)
+        self.X = np.broadcast_to(x, (len(y), len(x)))
+        self.Y = np.broadcast_to(y[:, None], (len(y), len(x)))
+
+    def get_level_axes(self, level):
+        """
+        Get the sample coordinates of a level, halving the resolution of the grid per level.
+
+        Returns:
+        tuple: (x, y) axes of the level.
+        """
+        step = 2 ** level
+        return (np.linspace(self.x[0], self.x[-1], ceil((len(self.x) - 1) / step) + 1),
+                np.linspace(self.y[0], self.y[-1], ceil((len(self.y) - 1) / step) + 1))
+
+    def get_level_spacing(self, level):
+        x, y = self.get_level_axes(level)
+        return max(x[1] - x[0], y[1] - y[0])
+
+    def get_tile_count(self, n):
+        return max(ceil((n - 1) / (self.tile_size - 1)), 1)
+
+    def get_tile(self, level, row, col):
+        """
+        Get a tile of Z, generating it (or loading it from the disk cache) if it is not cached.
+        Tile (row, col) starts at sample (row, col) * (tile_size - 1) of its level.
+
+        Returns:
+        tuple: (x, y, Z) of the tile.
+        """
+        x, y = self.get_level_axes(level)
+        stride = self.tile_size - 1
+        x = x[col * stride:col * stride + self.tile_size]
+        y = y[row * stride:row * stride + self.tile_size]
+        key = (level, row, col)
+        if key in self.tiles:
+            self.tiles.move_to_end(key)
+            return x, y, self.tiles[key]
+        Z, = self.get_cached_arrays((f'tile_{level}_{row}_{col}',), lambda: (self.get_grid_intensity(x, y),))
+        self.tiles[key] = Z
+        self.tile_bytes += Z.nbytes
+        # Drop the least recently used tiles, but keep the one just generated
+        while self.tile_bytes > self.tile_cache_bytes and len(self.tiles) > 1:
+            _, dropped = self.tiles.popitem(last=False)
+            self.tile_bytes -= dropped.nbytes
+        return x, y, Z
+
+    def get_region(self, x_range, y_range, level=0):
+        """
+        Assemble Z over a region from the tiles covering it.
+
+        Parameters:
+        x_range, y_range (tuple): Bounds of the region, clipped to the space.
+        level (int): Resolution level.
+
+        Returns:
+        tuple: (x, y, Z) with the samples of the level enclosing the region.
+        """
+        x, y = self.get_level_axes(level)
+        col_start = int(np.clip(np.searchsorted(x, x_range[0], side='right') - 1, 0, len(x) - 1))
+        col_stop = int(np.clip(np.searchsorted(x, x_range[1], side='left'), col_start, len(x) - 1)) + 1
+        row_start = int(np.clip(np.searchsorted(y, y_range[0], side='right') - 1, 0, len(y) - 1))
+        row_stop = int(np.clip(np.searchsorted(y, y_range[1], side='left'), row_start, len(y) - 1)) + 1
+        stride = self.tile_size - 1
+        Z = np.empty((row_stop - row_start, col_stop - col_start))
+        for row in range(row_start // stride, min((row_stop - 1) // stride, self.get_tile_count(len(y)) - 1) + 1):
+            for col in range(col_start // stride, min((col_stop - 1) // stride, self.get_tile_count(len(x)) - 1) + 1):
+                _, _, tile = self.get_tile(level, row, col)
+                rows = slice(max(row_start, row * stride), min(row_stop, row * stride + len(tile)))
+                cols = slice(max(col_start, col * stride), min(col_stop, col * stride + len(tile[0])))
+                Z[rows.start - row_start:rows.stop - row_start, cols.start - col_start:cols.stop - col_start] = \
+                    tile[rows.start - row * stride:rows.stop - row * stride, cols.start - col * stride:cols.stop - col * stride]
+        return x[col_start:col_stop], y[row_start:row_stop], Z
+
+    def get_level_tiles(self, level):
+        """
+        Get the level 0 tiles where the field can reach level. A peak contributes less than
+        level / P outside the box given by its cutoff exponent, so outside of every box the
+        P peaks together stay below level.
+
+        Returns:
+        np.ndarray: Boolean array of shape (tile rows, tile columns).
+        """
+        n_rows, n_cols = self.get_tile_count(len(self.y)), self.get_tile_count(len(self.x))
+        if level <= 0 or not len(self.peak_x0):
+            return np.full((n_rows, n_cols), level <= 0)
+        cutoff = np.maximum(self.get_peak_cutoff_exponent(level / len(self.peak_x0)), 0)
+        half_x = np.sqrt(cutoff / self.peak_inv_2sx2)
+        half_y = np.sqrt(cutoff / self.peak_inv_2sy2)
+        x0 = self.peak_x0 + self.shift_xyz.shift_x()
+        y0 = self.peak_y0 + self.shift_xyz.shift_y()
+        tile_width = (self.x[1] - self.x[0]) * (self.tile_size - 1)
+        tile_height = (self.y[1] - self.y[0]) * (self.tile_size - 1)
+        col0 = np.clip(np.floor((x0 - half_x - self.x[0]) / tile_width), 0, n_cols - 1).astype(int)
+        col1 = np.clip(np.floor((x0 + half_x - self.x[0]) / tile_width), 0, n_cols - 1).astype(int)
+        row0 = np.clip(np.floor((y0 - half_y - self.y[0]) / tile_height), 0, n_rows - 1).astype(int)
+        row1 = np.clip(np.floor((y0 + half_y - self.y[0]) / tile_height), 0, n_rows - 1).astype(int)
+        # Boxes that miss the space entirely
+        outside = ((x0 + half_x < self.x[0]) | (x0 - half_x > self.x[-1]) |
+                   (y0 + half_y < self.y[0]) | (y0 - half_y > self.y[-1]))
+        # Mark the tile rectangles of all boxes at once with a 2-D difference array
+        cover = np.zeros((n_rows + 1, n_cols + 1), int)
+        np.add.at(cover, (row0[~outside], col0[~outside]), 1)
+        np.add.at(cover, (row0[~outside], col1[~outside] + 1), -1)
+        np.add.at(cover, (row1[~outside] + 1, col0[~outside]), -1)
+        np.add.at(cover, (row1[~outside] + 1, col1[~outside] + 1), 1)
+        return cover.cumsum(axis=0).cumsum(axis=1)[:-1, :-1] > 0
+
+    def get_contour_arrays(self, level):
+        stride = self.tile_size - 1
+        rows, cols = np.nonzero(self.get_level_tiles(level))
+        tiles = ((row * stride, col * stride, *self.get_tile(0, row, col)) for row, col in zip(rows, cols))
+        return extract_tiled_isolines(tiles, level, (len(self.y), len(self.x)))
+
+    def set_raster(self, order=1, refinement=1):
+        """
+        Answer get_intensity by bilinear interpolation over the level 0 tiles, only the tiles
+        holding query points are generated. The interpolation error is not measured, as that
+        would generate the whole grid.
+        """
+        if order != 1 or refinement != 1:
+            raise ValueError("The tiled space only supports bilinear lookups at grid resolution")
+        self.raster_tiles = True
+        self.raster_bounds = (self.x[0], self.x[-1], self.y[0], self.y[-1])
+
+    def get_intensity_batch(self, xs, ys, t=None):
+        if not self.raster_tiles:
+            return super().get_intensity_batch(xs, ys, t)
+        xs, ys = np.broadcast_arrays(np.asarray(xs, float), np.asarray(ys, float))
+        x_min, x_max, y_min, y_max = self.raster_bounds
+        inside = (xs >= x_min) & (xs <= x_max) & (ys >= y_min) & (ys <= y_max)
+        intensity = np.empty(xs.shape)
+        intensity[~inside] = self.get_analytic_intensity_batch(xs[~inside], ys[~inside])
+        n_rows, n_cols = self.get_tile_count(len(self.y)), self.get_tile_count(len(self.x))
+        tile_width = (self.x[1] - self.x[0]) * (self.tile_size - 1)
+        tile_height = (self.y[1] - self.y[0]) * (self.tile_size - 1)
+        x_inside, y_inside = xs[inside], ys[inside]
+        col = np.clip(((x_inside - x_min) // tile_width).astype(int), 0, n_cols - 1)
+        row = np.clip(((y_inside - y_min) // tile_height).astype(int), 0, n_rows - 1)
+        values = np.empty(len(x_inside))
+        # One lookup per tile holding query points
+        keys, group = np.unique(row * n_cols + col, return_inverse=True)
+        for k, key in enumerate(keys):
+            select = group.ravel() == k
+            x, y, Z = self.get_tile(0, key // n_cols, key % n_cols)
+            values[select] = bilinear_lookup(x, y, Z, x_inside[select], y_inside[select])
+        intensity[inside] = values - self.target_isoline
+        return intensity
@@ -1,19 +1,55 @@
+import os
+import json
+import hashlib
 from .BaseSpace import *
 from .GaussianSpace import *
 from .ParabolicSpace import *
+from .DriftingSpace import *
+from .AdvectionDiffusionSpace import *
+from .TiledSpace import *
+from .shared import SharedArrays
 
 space_instance = {}
+CACHE_VERSION = 1
 
 # Register decorator
 def register_class(cls):
     space_instance[cls.name] = cls
     return cls
 
-def create_instance(class_name: str, **arguments) -> BaseSpace:
+def get_class(class_name: str) -> type:
     if class_name in space_instance:
-        return space_instance[class_name](**arguments)
-    else:
-        raise ValueError(f"Unknown class name: {class_name}")
+        return space_instance[class_name]
+    raise ValueError(f"Unknown class name: {class_name}")
+
+def get_cache_key(class_name: str, **arguments) -> str:
+    """
+    Hash the space type, its arguments and the contents of its peaks file.
+    """
+    digest = hashlib.sha256()
+    space_filename = arguments.get('space_filename', '')
+    if space_filename:
+        with open(space_filename, 'rb') as file:
+            digest.update(file.read())
+    arguments = {key: value for key, value in arguments.items() if key != 'space_filename'}
+    digest.update(json.dumps([CACHE_VERSION, class_name, arguments], sort_keys=True, default=list).encode())
+    return digest.hexdigest()
+
+
+def create_instance(class_name: str, cache_dir: str = "", shared_arrays: SharedArrays = None,
+                    **arguments) -> BaseSpace:
+    """
+    Create a space by name. With cache_dir the generated grid and contour arrays are stored
+    in cache_dir/spaces/<hash> and memory-mapped from there when the same space is created again.
+    With shared_arrays, the arrays another process published for the same space are attached.
+    """
+    space_class = get_class(class_name)
+    if cache_dir:
+        arguments['cache_path'] = os.path.join(cache_dir, 'spaces', get_cache_key(class_name, **arguments))
+    return space_class(shared_arrays=shared_arrays, **arguments)
 
 register_class(Gaussian3DSpace)
-register_class(Parabolic3DSpace)
\ No newline at end of file
+register_class(Parabolic3DSpace)
+register_class(DriftingGaussian3DSpace)
+register_class(AdvectionDiffusionSpace)
+register_class(TiledGaussian3DSpace)
\ No newline at end of file
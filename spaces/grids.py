@@ -0,0 +1,30 @@
+import numpy as np
+
+
+def bilinear_lookup(x, y, Z, xs, ys, fill_value=0.0):
+    """
+    Bilinear interpolation of a field sampled on a uniform grid.
+
+    Parameters:
+    x (np.ndarray): Uniformly spaced grid coordinates along the columns of Z, shape (nx,).
+    y (np.ndarray): Uniformly spaced grid coordinates along the rows of Z, shape (ny,).
+    Z (np.ndarray): Field values, shape (ny, nx).
+    xs, ys (array_like): Coordinates of the query points, any matching shape.
+    fill_value (float): Value returned for points outside the grid.
+
+    Returns:
+    np.ndarray: Interpolated values with the shape of xs.
+    """
+    xs, ys = np.broadcast_arrays(np.asarray(xs, float), np.asarray(ys, float))
+    nx, ny = len(x), len(y)
+    # Fractional cell coordinates of every point
+    u = (xs - x[0]) / (x[-1] - x[0]) * (nx - 1)
+    v = (ys - y[0]) / (y[-1] - y[0]) * (ny - 1)
+    inside = (u >= 0) & (u <= nx - 1) & (v >= 0) & (v <= ny - 1)
+    col = np.clip(np.floor(u).astype(int), 0, nx - 2)
+    row = np.clip(np.floor(v).astype(int), 0, ny - 2)
+    fu = np.clip(u - col, 0, 1)
+    fv = np.clip(v - row, 0, 1)
+    values = ((1 - fv) * ((1 - fu) * Z[row, col] + fu * Z[row, col + 1]) +
+              fv * ((1 - fu) * Z[row + 1, col] + fu * Z[row + 1, col + 1]))
+    return np.where(inside, values, fill_value)
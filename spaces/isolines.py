@@ -0,0 +1,201 @@
+import numpy as np
+
+# Marching squares lookup table. Cell corners are numbered as bits of the case index:
+# bottom-left = 1, bottom-right = 2, top-right = 4, top-left = 8 (bit set when Z > level).
+# Cell edges are numbered: bottom = 0, right = 1, top = 2, left = 3.
+# Saddle cases 5 and 10 are resolved by the value at the cell center, see marching_squares().
+SEGMENT_TABLE = {
+    1: [(3, 0)],
+    2: [(0, 1)],
+    3: [(3, 1)],
+    4: [(1, 2)],
+    6: [(0, 2)],
+    7: [(2, 3)],
+    8: [(2, 3)],
+    9: [(0, 2)],
+    11: [(1, 2)],
+    12: [(3, 1)],
+    13: [(0, 1)],
+    14: [(3, 0)],
+}
+# (center above the level, center below the level)
+SADDLE_TABLE = {
+    5: ([(0, 1), (2, 3)], [(3, 0), (1, 2)]),
+    10: ([(3, 0), (1, 2)], [(0, 1), (2, 3)]),
+}
+
+
+def marching_squares(x, y, Z, level):
+    """
+    Extract the isoline segments of a gridded field with linear interpolation along the cell edges.
+
+    Parameters:
+    x (np.ndarray): Grid coordinates along the columns of Z, shape (nx,).
+    y (np.ndarray): Grid coordinates along the rows of Z, shape (ny,).
+    Z (np.ndarray): Field values, shape (ny, nx).
+    level (float): Isoline level.
+
+    Returns:
+    tuple: (points, segments), where points is a (K, 2) array of the edge crossings
+           and segments is an (S, 2) array of indices into points.
+    """
+    x = np.asarray(x, float)
+    y = np.asarray(y, float)
+    Z = np.asarray(Z, float)
+    ny, nx = Z.shape
+    above = Z > level
+
+    # Edge crossings: horizontal edges (ny, nx - 1) first, then vertical edges (ny - 1, nx)
+    h_cross = above[:, :-1] != above[:, 1:]
+    v_cross = above[:-1, :] != above[1:, :]
+    h_rows, h_cols = np.nonzero(h_cross)
+    v_rows, v_cols = np.nonzero(v_cross)
+
+    # Crossed edges always join values on both sides of the level, so the denominators are nonzero
+    z0 = Z[h_rows, h_cols]
+    t = (level - z0) / (Z[h_rows, h_cols + 1] - z0)
+    h_points = np.column_stack((x[h_cols] + t * (x[h_cols + 1] - x[h_cols]), y[h_rows]))
+    z0 = Z[v_rows, v_cols]
+    t = (level - z0) / (Z[v_rows + 1, v_cols] - z0)
+    v_points = np.column_stack((x[v_cols], y[v_rows] + t * (y[v_rows + 1] - y[v_rows])))
+    points = np.concatenate((h_points, v_points))
+
+    # Map every grid edge to its crossing point index (-1 if the edge is not crossed)
+    h_index = np.full(h_cross.shape, -1, dtype=np.intp)
+    h_index[h_rows, h_cols] = np.arange(len(h_rows))
+    v_index = np.full(v_cross.shape, -1, dtype=np.intp)
+    v_index[v_rows, v_cols] = np.arange(len(v_rows)) + len(h_rows)
+
+    # Edge lookups per cell, shape (ny - 1, nx - 1)
+    cell_edges = (h_index[:-1, :], v_index[:, 1:], h_index[1:, :], v_index[:, :-1])
+    case = (above[:-1, :-1] * 1 + above[:-1, 1:] * 2 + above[1:, 1:] * 4 + above[1:, :-1] * 8)
+
+    segments = []
+    for case_index, pairs in SEGMENT_TABLE.items():
+        rows, cols = np.nonzero(case == case_index)
+        for a, b in pairs:
+            segments.append(np.column_stack((cell_edges[a][rows, cols], cell_edges[b][rows, cols])))
+    for case_index, (pairs_above, pairs_below) in SADDLE_TABLE.items():
+        rows, cols = np.nonzero(case == case_index)
+        center = 0.25 * (Z[rows, cols] + Z[rows, cols + 1] + Z[rows + 1, cols] + Z[rows + 1, cols + 1])
+        center_above = center > level
+        for select, pairs in ((center_above, pairs_above), (~center_above, pairs_below)):
+            for a, b in pairs:
+                segments.append(np.column_stack((cell_edges[a][rows[select], cols[select]],
+                                                 cell_edges[b][rows[select], cols[select]])))
+    segments = np.concatenate(segments) if segments else np.empty((0, 2), dtype=np.intp)
+
+    return points, segments
+
+
+def link_segments(n_points, segments):
+    """
+    Chain isoline segments sharing a crossing point into polylines.
+
+    Every crossing point belongs to at most two segments, so each polyline is found by
+    walking from an open end (or any point of a closed loop) to its neighbours.
+    Closed loops repeat their first point at the end.
+
+    Parameters:
+    n_points (int): Number of crossing points.
+    segments (np.ndarray): (S, 2) array of point indices.
+
+    Returns:
+    tuple: (order, offsets), where order lists point indices polyline by polyline and
+           polyline k is order[offsets[k]:offsets[k + 1]].
+    """
+    # Up to two segments per point, -1 marks a missing neighbour
+    neighbours = np.full((n_points, 2), -1, dtype=np.intp)
+    ends = segments.ravel()
+    seg_ids = np.repeat(np.arange(len(segments)), 2)
+    sort = np.argsort(ends, kind='stable')
+    ends, seg_ids = ends[sort], seg_ids[sort]
+    first = np.ones(len(ends), dtype=bool)
+    first[1:] = ends[1:] != ends[:-1]
+    neighbours[ends[first], 0] = seg_ids[first]
+    neighbours[ends[~first], 1] = seg_ids[~first]
+
+    open_ends = np.nonzero((neighbours[:, 0] >= 0) & (neighbours[:, 1] < 0))[0]
+    starts = np.concatenate((open_ends, np.arange(n_points))).tolist()
+    neighbours = neighbours.tolist()
+    segment_list = segments.tolist()
+    visited = [False] * len(segment_list)
+
+    order = []
+    offsets = [0]
+    for start in starts:
+        n0, n1 = neighbours[start]
+        seg = n0 if n0 >= 0 and not visited[n0] else n1
+        if seg < 0 or visited[seg]:
+            continue
+        point = start
+        order.append(point)
+        while seg >= 0 and not visited[seg]:
+            visited[seg] = True
+            a, b = segment_list[seg]
+            point = b if a == point else a
+            order.append(point)
+            n0, n1 = neighbours[point]
+            seg = n1 if n0 == seg else n0
+        offsets.append(len(order))
+
+    return np.array(order, dtype=np.intp), np.array(offsets, dtype=np.intp)
+
+
+def extract_isolines(x, y, Z, level):
+    """
+    Extract the isolines of a gridded field as polylines stored in contiguous arrays.
+
+    Parameters:
+    x (np.ndarray): Grid coordinates along the columns of Z, shape (nx,).
+    y (np.ndarray): Grid coordinates along the rows of Z, shape (ny,).
+    Z (np.ndarray): Field values, shape (ny, nx).
+    level (float): Isoline level.
+
+    Returns:
+    tuple: (points, offsets), where points is a (M, 2) array of polyline vertices and
+           polyline k is points[offsets[k]:offsets[k + 1]].
+    """
+    crossings, segments = marching_squares(x, y, Z, level)
+    order, offsets = link_segments(len(crossings), segments)
+    return np.ascontiguousarray(crossings[order]), offsets
+
+
+def extract_tiled_isolines(tiles, level, shape):
+    """
+    Extract the isolines of a gridded field that is only available block by block.
+    Neighbouring blocks share their edge samples, so a crossing on a shared edge is
+    found by both blocks: crossings are identified by their global edge and merged
+    before the segments are chained, giving the same polylines as one extraction over
+    the whole field.
+
+    Parameters:
+    tiles (iterable): (row0, col0, x, y, Z) blocks, where Z[0, 0] is sample (row0, col0) of the field.
+    level (float): Isoline level.
+    shape (tuple): (rows, cols) of the whole field.
+
+    Returns:
+    tuple: (points, offsets) as in extract_isolines().
+    """
+    n_rows, n_cols = shape
+    all_points, all_keys, all_segments = [], [], []
+    n_points = 0
+    for row0, col0, x, y, Z in tiles:
+        crossings, segments = marching_squares(x, y, Z, level)
+        if not len(segments):
+            continue
+        # Same edge order as in marching_squares: horizontal edges first, then vertical edges
+        above = np.asarray(Z) > level
+        h_rows, h_cols = np.nonzero(above[:, :-1] != above[:, 1:])
+        v_rows, v_cols = np.nonzero(above[:-1, :] != above[1:, :])
+        all_keys.append(np.concatenate(((row0 + h_rows) * n_cols + col0 + h_cols,
+                                        n_rows * n_cols + (row0 + v_rows) * n_cols + col0 + v_cols)))
+        all_points.append(crossings)
+        all_segments.append(segments + n_points)
+        n_points += len(crossings)
+    if not all_segments:
+        return np.empty((0, 2), float), np.zeros(1, dtype=np.intp)
+    keys, first, inverse = np.unique(np.concatenate(all_keys), return_index=True, return_inverse=True)
+    crossings = np.concatenate(all_points)[first]
+    order, offsets = link_segments(len(keys), inverse.ravel()[np.concatenate(all_segments)])
+    return np.ascontiguousarray(crossings[order]), offsets
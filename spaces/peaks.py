@@ -0,0 +1,70 @@
+"""
+peaks.py: Peak set files. Besides the JSON list of peaks, a peak set can be stored
+    in columns, as a .npy structured array (memory-mapped on load, every column is a
+    zero-copy view of the file) or as a .npz archive with one array per column.
+"""
+import os
+import json
+import numpy as np
+
+PEAK_COLUMNS = ('x0', 'y0', 'amplitude', 'sigma_x', 'sigma_y')
+PEAK_DTYPE = np.dtype([(name, float) for name in PEAK_COLUMNS])
+
+
+def get_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in ('.json', '.npy', '.npz'):
+        raise ValueError(f"Unknown peak file format: {filename}")
+    return extension
+
+
+def load_peak_columns(filename) -> dict:
+    """
+    Load a peak set as one array per column.
+
+    Parameters:
+    filename (str): .json, .npy or .npz peak file, no peaks if empty.
+
+    Returns:
+    dict: Arrays of shape (P,) keyed by PEAK_COLUMNS.
+    """
+    if not filename:
+        return {name: np.empty(0) for name in PEAK_COLUMNS}
+    extension = get_format(filename)
+    if extension == '.npy':
+        table = np.load(filename, mmap_mode='r')
+        return {name: table[name] for name in PEAK_COLUMNS}
+    if extension == '.npz':
+        with np.load(filename) as archive:
+            return {name: np.asarray(archive[name], float) for name in PEAK_COLUMNS}
+    with open(filename, 'r') as file:
+        data = json.load(file)
+    table = np.array([tuple(item[name] for name in PEAK_COLUMNS) for item in data], dtype=PEAK_DTYPE)
+    return {name: table[name] for name in PEAK_COLUMNS}
+
+
+def save_peak_columns(filename, columns):
+    """
+    Store a peak set, the format is given by the extension of filename.
+
+    Parameters:
+    filename (str): .json, .npy or .npz peak file.
+    columns (dict): Arrays of shape (P,) keyed by PEAK_COLUMNS.
+    """
+    extension = get_format(filename)
+    if extension == '.npy':
+        table = np.empty(len(columns[PEAK_COLUMNS[0]]), dtype=PEAK_DTYPE)
+        for name in PEAK_COLUMNS:
+            table[name] = columns[name]
+        np.save(filename, table)
+    elif extension == '.npz':
+        np.savez(filename, **{name: np.asarray(columns[name], float) for name in PEAK_COLUMNS})
+    else:
+        rows = zip(*(np.asarray(columns[name]).tolist() for name in PEAK_COLUMNS))
+        with open(filename, 'w') as file:
+            json.dump([dict(zip(PEAK_COLUMNS, row)) for row in rows], file, indent=4)
+
+
+def convert_peaks(source, target):
+    save_peak_columns(target, load_peak_columns(source))
+
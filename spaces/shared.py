@@ -0,0 +1,96 @@
+"""
+shared.py: Space arrays in shared memory. A parent process publishes the generated arrays
+    of a space once, worker processes on the same host attach read-only views of them
+    instead of generating their own copies.
+"""
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def attach_block(name) -> shared_memory.SharedMemory:
+    try:
+        # The publishing process alone unlinks the block
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 tracks attached blocks as well
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedArrays:
+    """
+    Named arrays in multiprocessing.shared_memory blocks. The instance that publishes the
+    arrays owns the blocks and unlinks them in close(). Other processes attach to them with
+    SharedArrays(handles), handles from get_handles().
+    """
+    def __init__(self, handles=None):
+        """
+        Parameters:
+        handles (dict): (block name, shape, dtype) by array name, empty and owning the blocks if None.
+        """
+        self.owner = handles is None
+        self.handles = dict(handles or {})
+        self.blocks = {}
+        self.arrays = {}
+        for name, (block_name, shape, dtype) in self.handles.items():
+            self.blocks[name] = attach_block(block_name)
+            self.arrays[name] = self.get_view(self.blocks[name], shape, dtype)
+
+    def __str__(self):
+        return (f'Shared arrays: {", ".join(self.arrays)} '
+                f'({sum(array.nbytes for array in self.arrays.values()) / 2 ** 20:.1f} MB)')
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    @staticmethod
+    def get_view(block, shape, dtype) -> np.ndarray:
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.flags.writeable = False
+        return array
+
+    def publish(self, arrays):
+        """
+        Copy arrays into new shared memory blocks.
+
+        Parameters:
+        arrays (dict): Arrays by name.
+
+        Returns:
+        SharedArrays: self.
+        """
+        if not self.owner:
+            raise ValueError("Only the publishing process can add shared arrays")
+        for name, array in arrays.items():
+            array = np.asarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self.blocks[name] = block
+            self.handles[name] = (block.name, array.shape, array.dtype.str)
+            self.arrays[name] = self.get_view(block, array.shape, array.dtype)
+            np.copyto(np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf), array)
+        return self
+
+    def get_handles(self) -> dict:
+        return dict(self.handles)
+
+    def close(self):
+        """
+        Release the views and blocks of this process, and unlink the blocks if it published them.
+        Attached views still held elsewhere in this process keep their blocks open.
+        """
+        self.arrays.clear()
+        for block in self.blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                pass
+            if self.owner:
+                block.unlink()
+        self.blocks.clear()
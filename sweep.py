@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sweep.py: Parameter sweep. Every point of a grid of configuration overrides is simulated in
+    a pool of processes, with its own DataStorage folder, and the distance statistics of all
+    runs are collected in one summary table:
+        python sweep.py -c config.json -g grid.json -w 8
+    The grid file holds either lists of values per configuration key, swept as their
+    Cartesian product,
+        {"mu": [0.25, 0.5, 1], "V_current": [0, 0.5]}
+    or a list of overrides, run as given,
+        [{"mu": 0.5, "peaks_filename": "peaks_.json"}, {"mu": 1, "sample_time": 0.05}]
+    Run k is seeded with seed + k unless its overrides set the seed. With share_spaces, the
+    static spaces of the runs are built once and their arrays shared with the processes.
+"""
+import os
+import csv
+import json
+import random
+import argparse
+import itertools
+import timeit
+import numpy as np
+import spaces as sp
+# Progress bars of parallel runs would interleave, tqdm reads this when it is imported
+os.environ.setdefault('TQDM_DISABLE', '1')
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from lib import simultaneous_simulate, get_track_statistics, get_ensemble_summary
+from tools import Arguments, DataStorage, plotting_all
+from main import create_controller, create_scheduler, create_space, create_vehicles
+
+
+def expand_grid(grid) -> list:
+    """
+    Expand a grid of configuration overrides into the overrides of every run.
+
+    Parameters:
+    grid (dict or list): Lists of values per key, swept as their Cartesian product,
+        or a list of override dictionaries.
+
+    Returns:
+    list: One dictionary of overrides per run.
+    """
+    if isinstance(grid, dict):
+        keys = list(grid)
+        return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+    return [dict(overrides) for overrides in grid]
+
+
+def get_worker_count(workers=0) -> int:
+    """
+    Get the number of worker processes, by default the number of cores available to this process.
+    """
+    if workers:
+        return workers
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Configuration keys that define a space, besides the config_arguments of its class
+SPACE_KEYS = ('peak_type', 'axis_abs_max', 'grid_size', 'shift_xyz', 'peaks_filename', 'target_isoline',
+              'peak_tolerance', 'cache_dir', 'raster_order', 'raster_refinement')
+space_cache = {}  # spaces built by this process, by get_space_key()
+shared_spaces = {}  # handles of the space arrays published by the parent, by get_space_key()
+
+
+def get_space_key(arguments) -> str:
+    keys = SPACE_KEYS + sp.get_class(arguments.peak_type).config_arguments
+    return json.dumps([getattr(arguments, key) for key in keys])
+
+
+def get_space(arguments) -> sp.BaseSpace:
+    """
+    Create the space of the configuration, or reuse the one built by an earlier run in this
+    process. Time-varying spaces carry the state of their run and are always created anew.
+    Arrays the parent published for the space are attached instead of generated.
+    """
+    key = get_space_key(arguments)
+    if key in space_cache:
+        return space_cache[key]
+    shared_arrays = sp.SharedArrays(shared_spaces[key]) if key in shared_spaces else None
+    space = create_space(arguments, shared_arrays=shared_arrays)
+    if not space.time_varying:
+        space_cache[key] = space
+    return space
+
+
+def publish_spaces(config, runs) -> dict:
+    """
+    Build every static space of the runs once and publish its arrays in shared memory. The
+    caller closes the returned SharedArrays, which unlinks the blocks. A space that cannot be
+    built is left to the runs, which report the error.
+
+    Returns:
+    dict: SharedArrays by get_space_key().
+    """
+    published = {}
+    for overrides in runs:
+        arguments = Arguments(**{**config, **overrides})
+        key = get_space_key(arguments)
+        if key in published or sp.get_class(arguments.peak_type).time_varying:
+            continue
+        try:
+            space = create_space(arguments)
+        except Exception:
+            continue
+        published[key] = sp.SharedArrays().publish(space.get_shared_arrays())
+    return published
+
+
+def initialize_worker(handles=None):
+    # Plots of the runs are only stored
+    import matplotlib
+    matplotlib.use('Agg')
+    shared_spaces.update(handles or {})
+
+
+def run_configuration(config, overrides, run) -> dict:
+    """
+    Simulate one run of a sweep and store its configuration, summary and, with store_raw,
+    its simulation data in a DataStorage folder of series run.
+
+    Parameters:
+    config (dict): Base configuration.
+    overrides (dict): Configuration keys changed in this run.
+    run (int): Index of the run.
+
+    Returns:
+    dict: Summary row: run, seed, overrides, distance statistics over the vehicles,
+        wall-clock seconds and result folder.
+    """
+    start = timeit.default_timer()
+    arguments = Arguments(**{**config, 'seed': config['seed'] + run, **overrides})
+    random.seed(arguments.seed)
+    np.random.seed(arguments.seed % 2 ** 32)
+
+    vehicles = create_vehicles(arguments)
+    space = get_space(arguments)
+    data_storage = DataStorage(space.type, run)
+    space.set_data_storage(data_storage)
+    controller = create_controller(arguments, vehicles, space)
+    controller.set_data_storage(data_storage)
+    scheduler, step_policy = create_scheduler(arguments, controller)
+    swarmData = simultaneous_simulate(controller=controller, scheduler=scheduler, step_policy=step_policy)
+
+    arguments.set_data_storage(data_storage)
+    arguments.store_in_config()
+    if arguments.store_raw:
+        np.save(data_storage.get_path('swarm_data', 'npy'), swarmData)
+    if arguments.store_plot:
+        plotting_all(space, store_plot=True)
+        plotting_all(controller,
+                     separating_plots=arguments.separating_plots,
+                     not_animated=arguments.not_animated,
+                     isometric=arguments.isometric,
+                     store_plot=True,
+                     big_picture=arguments.big_picture,
+                     swarmData=swarmData)
+
+    statistics = get_track_statistics(controller.quality_array, controller.sample_time, arguments.capture_distance)
+    summary = {key: float(value) for key, value in get_ensemble_summary(statistics).items()}
+    with open(data_storage.get_path('summary', 'json'), 'w') as file:
+        json.dump(summary, file, indent=4)
+    return {'run': run, 'seed': arguments.seed, **overrides, **summary,
+            'seconds': timeit.default_timer() - start, 'folder': data_storage.timestamped_folder}
+
+
+def run_sweep(config, runs, workers=0) -> list:
+    """
+    Simulate the runs of a sweep in a pool of worker processes.
+
+    Parameters:
+    config (dict): Base configuration.
+    runs (list): Overrides of every run, see expand_grid().
+    workers (int): Number of processes, by default the number of available cores.
+
+    Returns:
+    list: Summary rows ordered by run, with an error column for the runs that failed.
+    """
+    unknown = {key for overrides in runs for key in overrides} - set(config)
+    if unknown:
+        raise ValueError(f"Unknown configuration keys: {', '.join(sorted(unknown))}")
+    workers = min(get_worker_count(workers), len(runs)) or 1
+    print(f'Sweep of {len(runs)} runs on {workers} processes')
+    published = publish_spaces(config, runs) if config['share_spaces'] else {}
+    for shared_arrays in published.values():
+        print(shared_arrays)
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initialize_worker,
+                                 initargs=({key: shared_arrays.get_handles()
+                                            for key, shared_arrays in published.items()},)) as executor:
+            futures = {executor.submit(run_configuration, config, overrides, run): (run, overrides)
+                       for run, overrides in enumerate(runs)}
+            for future in as_completed(futures):
+                run, overrides = futures[future]
+                try:
+                    rows.append(future.result())
+                except Exception as error:
+                    rows.append({'run': run, **overrides, 'error': repr(error)})
+                print(f'run {run} finished ({len(rows)}/{len(runs)})')
+    finally:
+        for shared_arrays in published.values():
+            shared_arrays.close()
+    return sorted(rows, key=lambda row: row['run'])
+
+
+def get_columns(rows) -> list:
+    # Columns in order of first appearance, errors last
+    columns = list(dict.fromkeys(key for row in rows for key in row if key != 'error'))
+    return columns + ['error'] if any('error' in row for row in rows) else columns
+
+
+def print_summary(rows, columns):
+    columns = [column for column in columns if column != 'folder']
+    widths = [max(len(column), 10) + 2 for column in columns]
+    print(''.join(f'{column:>{width}}' for column, width in zip(columns, widths)))
+    for row in rows:
+        print(''.join(f'{row[column]:>{width}.4g}' if isinstance(row.get(column), float)
+                      else f'{str(row.get(column, "")):>{width}}' for column, width in zip(columns, widths)))
+
+
+def store_summary(rows, columns, data_storage):
+    with open(data_storage.get_path('sweep_summary', 'csv'), 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(data_storage.get_path('sweep_summary', 'json'), 'w') as file:
+        json.dump(rows, file, indent=4)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='sweep', description='Parameter sweep over a pool of processes')
+    parser.add_argument('-c', '--config-file', dest='config_filename', default='config.json', help='')
+    parser.add_argument('-g', '--grid-file', dest='grid_filename', required=True,
+                        help='JSON grid of configuration overrides')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes')
+    args = parser.parse_args()
+
+    with open(args.config_filename, 'r') as file:
+        config = json.load(file)
+    with open(args.grid_filename, 'r') as file:
+        runs = expand_grid(json.load(file))
+
+    data_storage = DataStorage('sweep', 0)
+    print(data_storage)
+    rows = run_sweep(config, runs, config['sweep_workers'] if args.workers is None else args.workers)
+    columns = get_columns(rows)
+    print_summary(rows, columns)
+    store_summary(rows, columns, data_storage)
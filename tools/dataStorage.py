@@ -106,7 +106,8 @@ class Arguments:
                     "big_picture": self.big_picture,
                     "not_animated": self.not_animated,
                     "store_raw": self.store_raw,
-                    "show_intensity": self.show_intensity,
+                    "separating_plots": self.separating_plots,
+                    "store_plot": self.store_plot,
                     "axis_abs_max": self.axis_abs_max,
                     "isometric": self.isometric,
                     "isolines": self.isolines,
@@ -119,6 +120,9 @@ class Arguments:
                     "start_points": self.start_points,
                     "shift_xyz": self.shift_xyz,
                     "target_isoline": self.target_isoline,
+                    "peak_tolerance": self.peak_tolerance,
+                    "raster_order": self.raster_order,
+                    "raster_refinement": self.raster_refinement,
                     "sim_time_sec": self.sim_time_sec,
                     "sample_time": self.sample_time,
                     "cycles": self.cycles,
@@ -126,8 +130,34 @@ class Arguments:
                     "vehicles": self.vehicles,
                     "grid_size": self.grid_size,
                     "FPS": self.FPS,
+                    "f0": self.f0,
+                    "mu": self.mu,
                     "V_current": self.V_current,
-                    "beta_current": self.beta_current
+                    "beta_current": self.beta_current,
+                    "diffusivity": self.diffusivity,
+                    "contour_interval": self.contour_interval,
+                    "solver_time_step": self.solver_time_step,
+                    "diffusion_method": self.diffusion_method,
+                    "tile_size": self.tile_size,
+                    "tile_levels": self.tile_levels,
+                    "tile_cache_mb": self.tile_cache_mb,
+                    "view_samples": self.view_samples,
+                    "planar": self.planar,
+                    "exact_arcs": self.exact_arcs,
+                    "integrator": self.integrator,
+                    "physics_time_step": self.physics_time_step,
+                    "integrator_tolerance": self.integrator_tolerance,
+                    "log_time_step": self.log_time_step,
+                    "adaptive_max_time_step": self.adaptive_max_time_step,
+                    "adaptive_safety": self.adaptive_safety,
+                    "ensemble_members": self.ensemble_members,
+                    "ensemble_V_current_std": self.ensemble_V_current_std,
+                    "ensemble_beta_current_std": self.ensemble_beta_current_std,
+                    "ensemble_seed": self.ensemble_seed,
+                    "capture_distance": self.capture_distance,
+                    "seed": self.seed,
+                    "sweep_workers": self.sweep_workers,
+                    "share_spaces": self.share_spaces
                 }
 
     # Save the variables to a new JSON file
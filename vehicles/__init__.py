@@ -11,11 +11,13 @@ def register_class(cls):
     vehicle_instance[cls.name] = cls
     return cls
 
-def create_instance(class_name: str, **arguments) -> Vehicle:
+def get_class(class_name: str) -> type:
     if class_name in vehicle_instance:
-        return vehicle_instance[class_name](**arguments)
-    else:
-        raise ValueError(f"Unknown class name: {class_name}")
+        return vehicle_instance[class_name]
+    raise ValueError(f"Unknown class name: {class_name}")
+
+def create_instance(class_name: str, **arguments) -> Vehicle:
+    return get_class(class_name)(**arguments)
 
 register_class(Otter)
 register_class(Dubins)
\ No newline at end of file
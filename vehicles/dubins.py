@@ -19,8 +19,11 @@ class Dubins(Vehicle):
         V_c: current speed (m/s)
         beta_c: current direction (deg)
         tau_X: surge force, pilot input (N)        
+        exact_arcs: propagate along the exact arcs of the held wheel speeds instead of integrating
     """
     name = 'dubins'
+    config_arguments = ('exact_arcs',)
+    heading_index = 3
     def __init__(
             self,
             controlSystem="stepInput",
@@ -31,7 +34,8 @@ class Dubins(Vehicle):
             serial_number=0,
             shift=None,
             color='b',
-            starting_point=None
+            starting_point=None,
+            exact_arcs=False
     ):
         super().__init__(V_current,
                          serial_number,
@@ -43,6 +47,7 @@ class Dubins(Vehicle):
         self.n_min = -5
         self.R = R # wheel radius
         self.B = B # the distance between the wheels
+        self.exact_arcs = exact_arcs
         self.L = 2.0  # Length (m)
         self.nu = np.array([0, 0, 0, 0, 0, 0], float)  # velocity vector
         self.u_actual = np.array([0, 0], float)  # propeller revolution states
@@ -62,6 +67,7 @@ class Dubins(Vehicle):
                 f'Control: {self.controlDescription}\n'
                 f'Wheel radius: {self.R} m\n'
                 f'Distance between the wheels: {self.B} m\n'
+                f'Integrator: {"exact arcs" if self.exact_arcs else self.integrator}\n'
                 f'Starting point: [{self.starting_point[0]}, {self.starting_point[1]}]')
 
     def dynamics(self, eta, nu, u_actual, u_control, sampleTime):
@@ -70,6 +76,74 @@ class Dubins(Vehicle):
         dtheta = (u_control[0] - u_control[1]) * self.R / self.B
         return np.array([dy, dx, 0, dtheta, 0, 0]), u_actual
 
+    def dynamics_batch(self, eta, nu, u_actual, u_control, sampleTime):
+        speed = (u_control[:, 0] + u_control[:, 1]) / 2 * self.R
+        nu = np.zeros((len(eta), 6), float)
+        nu[:, 0] = np.sin(eta[:, 3]) * speed
+        nu[:, 1] = np.cos(eta[:, 3]) * speed
+        nu[:, 3] = (u_control[:, 0] - u_control[:, 1]) * self.R / self.B
+        return nu, u_actual
+
+    def get_derivatives_batch(self, eta, nu, u_actual, u_control):
+        # Kinematic model: the velocity follows the wheel speeds, only eta is a state
+        eta_dot, _ = self.dynamics_batch(eta, nu, u_actual, u_control, 0)
+        return eta_dot, np.zeros_like(nu, float), np.zeros_like(u_actual, float)
+
+    @property
+    def closed_form(self) -> bool:
+        return self.exact_arcs
+
+    def get_arc_batch(self, eta, u_control, durations):
+        """
+        Propagate V vehicles along the circular arcs, or straight lines, driven by constant
+        wheel speeds. With the turn angle dtheta = omega * t over a time t the displacement is
+        the chord v * t * sinc(dtheta / 2) in the direction theta + dtheta / 2, which stays
+        exact for omega = 0.
+
+        Parameters:
+        eta (np.ndarray): Positions/attitudes of shape (V, 6).
+        u_control (np.ndarray): Wheel speeds of shape (V, 2).
+        durations (np.ndarray): Times t of shape (J,).
+
+        Returns:
+        np.ndarray: Positions/attitudes at the times, of shape (J, V, 6).
+        """
+        speed = (u_control[:, 0] + u_control[:, 1]) / 2 * self.R
+        omega = (u_control[:, 0] - u_control[:, 1]) * self.R / self.B
+        t = np.asarray(durations, float)[:, None]
+        turn = omega * t
+        heading = eta[:, 3] + turn / 2
+        chord = speed * t * np.sinc(turn / (2 * np.pi))  # np.sinc(x) = sin(pi x) / (pi x)
+        etas = np.repeat(np.asarray(eta, float)[None], len(t), axis=0)
+        etas[:, :, 0] += chord * np.sin(heading)
+        etas[:, :, 1] += chord * np.cos(heading)
+        etas[:, :, 3] += turn
+        return etas
+
+    def get_hold_trajectory_batch(self, eta, nu, u_actual, u_control, sample_time, samples):
+        """
+        [etas, nus, u_actuals] = get_hold_trajectory_batch(eta, nu, u_actual, u_control, sample_time, samples)
+        propagates V vehicles over the next samples with u_control held, in closed form.
+        Row j of the (samples, V, ...) results is the state after j + 1 samples, nu being
+        the mean velocity over the sample before it.
+        """
+        etas = self.get_arc_batch(eta, u_control, sample_time * np.arange(samples + 1))
+        nus = np.diff(etas, axis=0) / sample_time
+        return etas[1:], nus, np.repeat(np.asarray(u_actual, float)[None], samples, axis=0)
+
+    def step_batch(self, eta, nu, u_actual, u_control, sample_time):
+        if self.exact_arcs:
+            etas, nus, u_actuals = self.get_hold_trajectory_batch(eta, nu, u_actual, u_control, sample_time, 1)
+            return etas[0], nus[0], u_actuals[0]
+        eta_next, nu, u_actual = super().step_batch(eta, nu, u_actual, u_control, sample_time)
+        if self.integrator.name != 'euler':
+            # Report the mean velocity over the sample, as forward Euler does
+            nu = (eta_next - eta) / sample_time
+        return eta_next, nu, u_actual
+
+    def get_batch_key(self) -> tuple:
+        return (self.R, self.B, self.exact_arcs)
+
     def controlAllocation(self, tau_X, tau_N):
         """
         [n1, n2] = controlAllocation(tau_X, tau_N)
@@ -86,4 +160,7 @@ class Dubins(Vehicle):
     def repositioning(self, eta, nu, sample_time):
         # print(f'eta = {eta}')
         # print(f'nu = {nu}')
-        return eta+nu*sample_time
\ No newline at end of file
+        return eta+nu*sample_time
+
+    def repositioning_batch(self, eta, nu, sample_time):
+        return eta + nu * sample_time
\ No newline at end of file
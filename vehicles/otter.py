@@ -41,9 +41,10 @@ Author:     Thor I. Fossen
 """
 import math
 from .vehicle import *
-from lib import attitudeEuler
+from lib import attitudeEuler, attitudeEulerBatch, attitudeRatesBatch
 from tools.random_generators import *
 from lib.gnc import Smtrx, Hmtrx, Rzyx, m2c, crossFlowDrag, sat
+from lib.gnc import Hoerner, crossFlowStripSums
 
 
 # Class Vehicle
@@ -57,8 +58,11 @@ class Otter(Vehicle):
         V_c: current speed (m/s)
         beta_c: current direction (deg)
         tau_X: surge force, pilot input (N)        
+        planar: reduced 3-DOF model in surge, sway and yaw
     """
     name = 'otter'
+    config_arguments = ('planar',)
+    row_parameters = ('V_c', 'beta_c')
     def __init__(
             self,
             controlSystem="stepInput",
@@ -69,7 +73,8 @@ class Otter(Vehicle):
             serial_number=0,
             shift=None,
             color='b',
-            starting_point=None
+            starting_point=None,
+            planar=False
     ):
         super().__init__(V_current,
                          serial_number,
@@ -98,6 +103,7 @@ class Otter(Vehicle):
         self.beta_c = beta_current * D2R
         self.controlMode = controlSystem
         self.tauX = tau_X  # surge force (N)
+        self.planar = planar
 
         # Initialize the Otter USV model
         self.T_n = 1.0  # propeller time constants (s)
@@ -231,10 +237,67 @@ class Otter(Vehicle):
         self.wn_d = self.wn / 5  # desired natural frequency in yaw
         self.zeta_d = 1  # desired relative damping ratio
 
+        self.set_folded_constants()
+
+    def set_folded_constants(self):
+        """
+        Precompute everything in the equations of motion that does not depend on the state,
+        premultiplied by Minv, so that dynamics_batch() only evaluates the state-dependent terms:
+
+            C(nu_r) nu_r = sum_j nu_r[j] Q[j] nu_r,  Q[j] = CA(e_j) + CRB(e_j)
+        since both Coriolis matrices are linear in the velocity, CRB only in the angular rates,
+        which equal those of nu_r. Only the strip sums of the cross-flow drag depend on the state.
+        """
+        # Coriolis and centripetal matrices of the unit velocity vectors
+        Q = np.zeros((6, 6, 6))
+        for j in range(6):
+            e_j = np.identity(6)[j]
+            CA = m2c(self.MA, e_j)
+            CA[5, 0] = 0
+            CA[5, 1] = 0
+            CA[0, 5] = 0
+            CA[1, 5] = 0
+            Q[j] = CA
+            if j >= 3:
+                CRB_CG = np.zeros((6, 6))
+                CRB_CG[0:3, 0:3] = self.m_total * Smtrx(e_j[3:6])
+                CRB_CG[3:6, 3:6] = -Smtrx(np.matmul(self.Ig, e_j[3:6]))
+                Q[j] += self.H_rg.T @ CRB_CG @ self.H_rg
+        # Quadratic form as one matrix product: row 6 j + k holds Minv Q[j][:, k]
+        self.Minv_Q = (self.Minv @ Q).transpose(0, 2, 1).reshape(36, 6)
+
+        # Thrust of both propellers to forces and moments
+        thrust_map = np.zeros((6, 2))
+        thrust_map[0] = 1, 1
+        thrust_map[5] = -self.l1, -self.l2
+        self.Minv_thrust = self.Minv @ thrust_map
+
+        # Payload: g_0 = mp g [I; S_rp] R^T e_z, R^T e_z being the last row of R
+        self.Minv_payload = self.mp * self.g * self.Minv @ np.vstack((np.identity(3), self.S_rp))
+
+        self.Minv_D = self.Minv @ self.D
+        self.Minv_G = self.Minv @ self.G
+        self.Minv_yaw_damping = -10 * self.D[5, 5] * self.Minv[:, 5]
+
+        # Cross-flow drag strips (see crossFlowDrag)
+        self.crossflow_dx = self.L / 20
+        self.crossflow_coefficient = -0.5 * 1026 * self.T * Hoerner(self.B_pont, self.T) * self.crossflow_dx
+
+        # Planar model: the surge, sway and yaw rows and columns, heave, roll and pitch held at zero,
+        # which also removes the restoring forces and the payload terms in these rows
+        planar = np.array([0, 1, 5])
+        self.Minv3 = np.linalg.inv(self.M[np.ix_(planar, planar)])
+        self.Minv3_Q = (self.Minv3 @ Q[np.ix_(planar, planar, planar)]).transpose(0, 2, 1).reshape(9, 3)
+        self.Minv3_thrust = self.Minv3 @ thrust_map[planar]
+        self.Minv3_D = self.Minv3 @ self.D[np.ix_(planar, planar)]
+        self.Minv3_yaw_damping = -10 * self.D[5, 5] * self.Minv3[:, 2]
+
     def __str__(self):
         return (f'---vehicle--------------------------------------------------------------------------\n'
                 f'{self.type}\n'
                 f'Length: {self.L} m\n'
+                f'Model: {"3-DOF planar" if self.planar else "6-DOF"}\n'
+                f'Integrator: {self.integrator}\n'
                 f'Control: {self.controlDescription}\n'
                 f'Starting point: [{self.starting_point[0]}, {self.starting_point[1]}]')
 
@@ -243,6 +306,9 @@ class Otter(Vehicle):
         [nu,u_actual] = dynamics(eta,nu,u_actual,u_control,sampleTime) integrates
         the Otter USV equations of motion using Euler's method.
         """
+        if self.planar:
+            nu, u_actual = self.dynamics_batch(eta[None], nu[None], u_actual[None], u_control[None], sampleTime)
+            return nu[0], u_actual[0]
 
         # Input vector
         n = np.array([u_actual[0], u_actual[1]])
@@ -337,6 +403,158 @@ class Otter(Vehicle):
 
         return nu, u_actual
 
+    def dynamics_batch(self, eta, nu, u_actual, u_control, sampleTime):
+        """
+        [nu,u_actual] = dynamics_batch(eta,nu,u_actual,u_control,sampleTime) integrates
+        the Otter USV equations of motion of V vehicles at once, eta and nu of
+        shape (V, 6), u_actual and u_control of shape (V, 2). Same equations as dynamics(),
+        with the constant terms folded by set_folded_constants().
+        """
+        if self.planar:
+            return self.get_planar_dynamics(nu, u_actual, u_control, sampleTime,
+                                            np.cos(eta[:, 5]), np.sin(eta[:, 5]))
+
+        n = np.clip(u_actual, self.n_min, self.n_max)  # saturation, physical limits
+        nu_dot = self.get_acceleration_batch(eta, nu, n)  # USV dynamics
+        n_dot = (u_control - n) / self.T_n  # propeller dynamics
+
+        # Forward Euler integration [k+1]
+        nu = nu + sampleTime * nu_dot
+        n = n + sampleTime * n_dot
+
+        return nu, n
+
+    def get_acceleration_batch(self, eta, nu, n):
+        """
+        nu_dot = get_acceleration_batch(eta,nu,n) evaluates the 6-DOF equations of motion of
+        V vehicles with saturated propeller revolutions n.
+        """
+
+        # Current velocities
+        u_c = self.V_c * np.cos(self.beta_c - eta[:, 5])  # current surge vel.
+        v_c = self.V_c * np.sin(self.beta_c - eta[:, 5])  # current sway vel.
+
+        nu_r = np.array(nu, float)  # relative velocity vectors
+        nu_r[:, 0] -= u_c
+        nu_r[:, 1] -= v_c
+        r = nu_r[:, 5:6]
+
+        # Control forces and moments
+        thrust = np.where(n > 0, self.k_pos, self.k_neg) * n * np.abs(n)
+
+        # Payload, the last row of Rzyx
+        cth = np.cos(eta[:, 4])
+        R_z = np.column_stack((-np.sin(eta[:, 4]), cth * np.sin(eta[:, 3]), cth * np.cos(eta[:, 3])))
+
+        # Cross-flow drag
+        S0, S1 = crossFlowStripSums(nu_r[:, 1], nu_r[:, 5], -self.L / 2, self.crossflow_dx, 20)
+        Yh = self.crossflow_coefficient * S0[:, None]  # sway force
+        Nh = self.crossflow_coefficient * S1[:, None]  # yaw moment
+
+        nu_dot = (
+                thrust @ self.Minv_thrust.T
+                - nu_r @ self.Minv_D.T
+                + np.abs(r) * r * self.Minv_yaw_damping
+                + Yh * self.Minv[:, 1]
+                + Nh * self.Minv[:, 5]
+                - (nu_r[:, :, None] * nu_r[:, None, :]).reshape(-1, 36) @ self.Minv_Q
+                - eta @ self.Minv_G.T
+                + R_z @ self.Minv_payload.T
+        )
+        nu_dot[:, 0] += nu[:, 5] * v_c
+        nu_dot[:, 1] -= nu[:, 5] * u_c
+        return nu_dot
+
+    def get_planar_dynamics(self, nu, u_actual, u_control, sampleTime, cos_psi, sin_psi):
+        """
+        [nu,u_actual] = get_planar_dynamics(nu,u_actual,u_control,sampleTime,cos_psi,sin_psi)
+        integrates the 3-DOF equations of motion in surge, sway and yaw of V vehicles,
+        given the cosine and sine of their yaw angles. The other velocities stay zero.
+        """
+        n = np.clip(u_actual, self.n_min, self.n_max)  # saturation, physical limits
+        nu_dot = self.get_planar_acceleration_batch(nu, n, cos_psi, sin_psi)  # USV dynamics
+        n_dot = (u_control - n) / self.T_n  # propeller dynamics
+
+        # Forward Euler integration [k+1]
+        nu_next = np.zeros_like(nu, float)
+        nu_next[:, [0, 1, 5]] = nu[:, [0, 1, 5]] + sampleTime * nu_dot
+        n = n + sampleTime * n_dot
+
+        return nu_next, n
+
+    def get_planar_acceleration_batch(self, nu, n, cos_psi, sin_psi):
+        """
+        nu_dot = get_planar_acceleration_batch(nu,n,cos_psi,sin_psi) evaluates the 3-DOF
+        equations of motion of V vehicles, returning the surge, sway and yaw accelerations.
+        """
+
+        # Current velocities, cos(beta_c - psi) and sin(beta_c - psi) expanded
+        u_c = self.V_c * (np.cos(self.beta_c) * cos_psi + np.sin(self.beta_c) * sin_psi)
+        v_c = self.V_c * (np.sin(self.beta_c) * cos_psi - np.cos(self.beta_c) * sin_psi)
+
+        nu_r = nu[:, [0, 1, 5]]  # relative velocity vectors (u, v, r)
+        nu_r[:, 0] -= u_c
+        nu_r[:, 1] -= v_c
+        r = nu_r[:, 2:3]
+
+        # Control forces and moments
+        thrust = np.where(n > 0, self.k_pos, self.k_neg) * n * np.abs(n)
+
+        # Cross-flow drag
+        S0, S1 = crossFlowStripSums(nu_r[:, 1], nu_r[:, 2], -self.L / 2, self.crossflow_dx, 20)
+        Yh = self.crossflow_coefficient * S0[:, None]  # sway force
+        Nh = self.crossflow_coefficient * S1[:, None]  # yaw moment
+
+        nu_dot = (
+                thrust @ self.Minv3_thrust.T
+                - nu_r @ self.Minv3_D.T
+                + np.abs(r) * r * self.Minv3_yaw_damping
+                + Yh * self.Minv3[:, 1]
+                + Nh * self.Minv3[:, 2]
+                - (nu_r[:, :, None] * nu_r[:, None, :]).reshape(-1, 9) @ self.Minv3_Q
+        )
+        nu_dot[:, 0] += nu[:, 5] * v_c
+        nu_dot[:, 1] -= nu[:, 5] * u_c
+        return nu_dot
+
+    def get_planar_rates(self, nu, cos_psi, sin_psi):
+        """
+        eta_dot = get_planar_rates(nu,cos_psi,sin_psi) computes the planar kinematics of V vehicles:
+        North and East velocities and yaw rate, the other rates being zero.
+        """
+        eta_dot = np.zeros_like(nu, float)
+        eta_dot[:, 0] = cos_psi * nu[:, 0] - sin_psi * nu[:, 1]
+        eta_dot[:, 1] = sin_psi * nu[:, 0] + cos_psi * nu[:, 1]
+        eta_dot[:, 5] = nu[:, 5]
+        return eta_dot
+
+    def euler_step_batch(self, eta, nu, u_actual, u_control, sample_time):
+        if not self.planar:
+            return super().euler_step_batch(eta, nu, u_actual, u_control, sample_time)
+        # The yaw angle of step k enters both the current velocities and the kinematics
+        cos_psi = np.cos(eta[:, 5])
+        sin_psi = np.sin(eta[:, 5])
+        nu, u_actual = self.get_planar_dynamics(nu, u_actual, u_control, sample_time, cos_psi, sin_psi)
+        return eta + sample_time * self.get_planar_rates(nu, cos_psi, sin_psi), nu, u_actual
+
+    def get_derivatives_batch(self, eta, nu, u_actual, u_control):
+        """
+        [eta_dot,nu_dot,u_actual_dot] = get_derivatives_batch(eta,nu,u_actual,u_control) evaluates
+        the continuous-time equations of motion and kinematics of V vehicles.
+        """
+        n = np.clip(u_actual, self.n_min, self.n_max)  # saturation, physical limits
+        n_dot = (u_control - n) / self.T_n  # propeller dynamics
+        if not self.planar:
+            return attitudeRatesBatch(eta, nu), self.get_acceleration_batch(eta, nu, n), n_dot
+        cos_psi = np.cos(eta[:, 5])
+        sin_psi = np.sin(eta[:, 5])
+        nu_dot = np.zeros_like(nu, float)
+        nu_dot[:, [0, 1, 5]] = self.get_planar_acceleration_batch(nu, n, cos_psi, sin_psi)
+        return self.get_planar_rates(nu, cos_psi, sin_psi), nu_dot, n_dot
+
+    def get_batch_key(self) -> tuple:
+        return (self.planar,)
+
     def controlAllocation(self, tau_X, tau_N):
         """
         [n1, n2] = controlAllocation(tau_X, tau_N)
@@ -351,4 +569,11 @@ class Otter(Vehicle):
         return n1, n2
 
     def repositioning(self, eta, nu, sample_time):
-        return attitudeEuler(eta, nu, sample_time)
\ No newline at end of file
+        if self.planar:
+            return self.repositioning_batch(eta[None], nu[None], sample_time)[0]
+        return attitudeEuler(eta, nu, sample_time)
+
+    def repositioning_batch(self, eta, nu, sample_time):
+        if self.planar:
+            return eta + sample_time * self.get_planar_rates(nu, np.cos(eta[:, 5]), np.sin(eta[:, 5]))
+        return attitudeEulerBatch(eta, nu, sample_time)
\ No newline at end of file
@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import numpy as np
+from integrators import EulerIntegrator
 
 
 class Vehicle:
     name = 'vehicle'
+    config_arguments = ()
+    heading_index = 5  # column of the heading in eta
+    row_parameters = ()  # parameters that may differ between the rows of a batch
     def __init__(
             self,
             V_current=0,
@@ -23,12 +27,68 @@ class Vehicle:
             self.starting_point = np.array([0, 0], float) + np.array(shift, float)
         else:
             self.starting_point = np.array(starting_point, float) + np.array(shift, float)
+        self.starting_heading = 0
         self.color = color
         self.data_storage = None
+        self.integrator = EulerIntegrator()
 
     def dynamics(self, eta, nu, u_actual, u_control, sampleTime):
         pass
 
+    def dynamics_batch(self, eta, nu, u_actual, u_control, sampleTime):
+        """
+        [nu, u_actual] = dynamics_batch(eta, nu, u_actual, u_control, sampleTime) integrates
+        many vehicles sharing the parameters of this one, one row per vehicle.
+        Vehicle classes without a batched kernel are stepped row by row.
+        """
+        results = [self.dynamics(eta[k], nu[k], u_actual[k], u_control[k], sampleTime) for k in range(len(eta))]
+        return (np.array([result[0] for result in results], float).reshape(nu.shape),
+                np.array([result[1] for result in results], float).reshape(u_actual.shape))
+
+    def repositioning_batch(self, eta, nu, sample_time):
+        return np.array([self.repositioning(eta[k], nu[k], sample_time) for k in range(len(eta))],
+                        float).reshape(eta.shape)
+
+    def step_batch(self, eta, nu, u_actual, u_control, sample_time):
+        """
+        [eta, nu, u_actual] = step_batch(eta, nu, u_actual, u_control, sample_time) propagates
+        a batch by one controller sample with the integrator of this vehicle.
+        """
+        return self.integrator.integrate(self, eta, nu, u_actual, u_control, sample_time)
+
+    def euler_step_batch(self, eta, nu, u_actual, u_control, sample_time):
+        """
+        [eta, nu, u_actual] = euler_step_batch(eta, nu, u_actual, u_control, sample_time) propagates
+        the dynamics and then the attitude of a batch by one forward Euler step. Vehicle classes can
+        override it to share work between both.
+        """
+        nu_next, u_actual = self.dynamics_batch(eta, nu, u_actual, u_control, sample_time)
+        return self.repositioning_batch(eta, nu_next, sample_time), nu_next, u_actual
+
+    def get_derivatives_batch(self, eta, nu, u_actual, u_control):
+        """
+        [eta_dot, nu_dot, u_actual_dot] = get_derivatives_batch(eta, nu, u_actual, u_control) evaluates
+        the continuous-time model of a batch, needed by every integrator but forward Euler.
+        """
+        raise NotImplementedError(f"The {self.name} vehicle only supports the euler integrator")
+
+    @property
+    def closed_form(self) -> bool:
+        """
+        Whether get_hold_trajectory_batch() propagates this vehicle over many samples at once.
+        """
+        return False
+
+    def get_hold_trajectory_batch(self, eta, nu, u_actual, u_control, sample_time, samples):
+        raise NotImplementedError(f"The {self.name} vehicle has no closed-form solution")
+
+    def get_batch_key(self) -> tuple:
+        """
+        Parameters that have to match for vehicles of this class to be integrated in one batch.
+        The row_parameters are left out, a batch gets them as arrays with one value per row.
+        """
+        return (self.serial_number,)
+
     def controlAllocation(self, tau_X, tau_N):
         pass
 
@@ -37,3 +97,6 @@ class Vehicle:
 
     def set_data_storage(self, data_storage):
         self.data_storage = data_storage
+
+    def set_integrator(self, integrator):
+        self.integrator = integrator